@@ -0,0 +1,318 @@
+"""Segmented, append-only storage for notes.
+
+Instead of one ever-growing ``notes.txt``, notes are appended to the
+newest of a series of segment files inside a directory:
+
+    notes.d/
+        manifest.json      list of segments, their note counts and sizes
+        00000001.seg       one note per line (sealed, read-only)
+        00000002.seg       ...
+        00000007.seg       the active segment, appended to
+
+When the active segment reaches ``segment_size`` bytes it is sealed and
+a new one is started. Sealed segments never change, so their note counts
+and sizes are kept in the manifest: opening the store reads the manifest
+and counts only the active segment, and showing the most recent notes
+reads only the newest segment(s). Both costs stay flat as history grows.
+
+Segments are read through ``mmap``, so the OS pages in just what is
+looked at. Once there are many sealed segments and some neighbours are
+small enough to merge, a background thread compacts runs of them into
+larger ones; the manifest is replaced atomically, so a crash
+mid-compaction loses nothing, and its leftovers are removed on the next
+open.
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import threading
+from pathlib import Path
+
+
+MANIFEST = "manifest.json"
+
+# Seal the active segment once it holds this many bytes.
+DEFAULT_SEGMENT_SIZE = 1024 * 1024
+
+# Compact once this many sealed segments are waiting...
+DEFAULT_COMPACT_AFTER = 8
+
+# ...merging neighbours into segments of up to this many bytes.
+DEFAULT_COMPACT_SIZE = 16 * DEFAULT_SEGMENT_SIZE
+
+
+def _split_notes(data: bytes) -> list[str]:
+    """Split segment bytes (each note ends with "\n") into notes."""
+    lines = data.decode("utf-8").split("\n")
+    if lines[-1] == "":
+        lines.pop()
+    return [line.rstrip("\r") for line in lines]
+
+
+def _read_segment(path: Path) -> list[str]:
+    """Return the notes stored in one segment file."""
+    with path.open("rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return []  # mmap can't map an empty file
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            return _split_notes(m[:])
+
+
+def _tail_segment(path: Path, n: int) -> list[str]:
+    """Return the last ``n`` notes of a segment without reading it all."""
+    with path.open("rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            # Every note ends with "\n": step back over n of them.
+            start = len(m) - 1
+            for _ in range(n):
+                start = m.rfind(b"\n", 0, start)
+                if start < 0:
+                    break
+            return _split_notes(m[start + 1:])
+
+
+class SegmentedNoteStore:
+    """Notes kept in size-capped segment files under ``directory``.
+
+    Numbering is global and 1-based, as in ``view_notes``.
+    """
+
+    def __init__(self, directory: Path,
+                 segment_size: int = DEFAULT_SEGMENT_SIZE,
+                 compact_after: int = DEFAULT_COMPACT_AFTER,
+                 compact_size: int = DEFAULT_COMPACT_SIZE) -> None:
+        self.directory = directory
+        self.segment_size = segment_size
+        self.compact_after = compact_after
+        self.compact_size = compact_size
+
+        # Guards the manifest and the segment list against the compactor.
+        self._lock = threading.Lock()
+        self._compactor: threading.Thread | None = None
+
+        # Each entry: {"name": ..., "count": int}, plus "size" in bytes
+        # once sealed; the last one is active.
+        self._segments: list[dict] = []
+        self._next_id = 1
+        self._load()
+
+    # -- manifest -----------------------------------------------------
+
+    def _load(self) -> None:
+        """Read the manifest and count the notes in the active segment."""
+        try:
+            with (self.directory / MANIFEST).open("r",
+                                                  encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        self._segments = data["segments"]
+        self._next_id = data["next_id"]
+        if self._segments:
+            active = self._segments[-1]
+            try:
+                active["count"] = len(_read_segment(self._path(active)))
+            except FileNotFoundError:
+                active["count"] = 0  # created, but nothing written yet
+        self._remove_orphans()
+
+    def _save(self) -> None:
+        """Atomically replace the manifest with the current segment list."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = self.directory / (MANIFEST + ".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump({"next_id": self._next_id,
+                       "segments": self._segments}, f, indent=1)
+        os.replace(tmp, self.directory / MANIFEST)
+
+    def _remove_orphans(self) -> None:
+        """Delete files left behind by an interrupted compaction or save.
+
+        That is segments the manifest doesn't list and any ``*.tmp``
+        (a half-written merge or manifest).
+        """
+        known = {s["name"] for s in self._segments}
+        for path in self.directory.glob("*.seg"):
+            if path.name not in known:
+                path.unlink(missing_ok=True)
+        for path in self.directory.glob("*.tmp"):
+            path.unlink(missing_ok=True)
+
+    def _path(self, segment: dict) -> Path:
+        return self.directory / segment["name"]
+
+    def _size(self, segment: dict) -> int:
+        """Byte size of a sealed segment, recorded when it was sealed."""
+        if "size" not in segment:  # manifests written before sizes were
+            segment["size"] = self._path(segment).stat().st_size
+        return segment["size"]
+
+    def _new_segment_name(self) -> str:
+        name = f"{self._next_id:08d}.seg"
+        self._next_id += 1
+        return name
+
+    # -- writing ------------------------------------------------------
+
+    def append(self, note: str) -> int:
+        """Append a one-line note; return its number.
+
+        Raises:
+            ValueError: if the note is empty or spans several lines.
+            OSError: if the segment or manifest can't be written.
+        """
+        if not note or len(note.splitlines()) != 1:
+            raise ValueError("a note must be a single non-empty line")
+        with self._lock:
+            if not self._segments:
+                self._segments.append({"name": self._new_segment_name(),
+                                       "count": 0})
+                self._save()
+            active = self._segments[-1]
+            with self._path(active).open("a", encoding="utf-8") as f:
+                f.write(note + "\n")
+                size = f.tell()
+            active["count"] += 1
+            number = self.count()
+            if size >= self.segment_size:
+                self._roll_over()
+        self.maybe_compact()
+        return number
+
+    def _roll_over(self) -> None:
+        """Seal the active segment and start a new one (lock held)."""
+        self._size(self._segments[-1])
+        self._segments.append({"name": self._new_segment_name(),
+                               "count": 0})
+        self._save()
+
+    def import_file(self, path: Path) -> None:
+        """Adopt an old single-file ``notes.txt`` as the first segment.
+
+        Only allowed while the store is empty; the file is moved, not
+        copied.
+        """
+        with self._lock:
+            if self._segments:
+                raise ValueError("the note store is not empty")
+            self.directory.mkdir(parents=True, exist_ok=True)
+            segment = {"name": self._new_segment_name(), "count": 0}
+            text = path.read_text(encoding="utf-8")
+            if text and not text.endswith("\n"):
+                with path.open("a", encoding="utf-8") as f:
+                    f.write("\n")
+            segment["count"] = len(_split_notes(text.encode("utf-8")))
+            os.replace(path, self._path(segment))
+            self._segments.append(segment)
+            self._roll_over()
+
+    # -- reading ------------------------------------------------------
+
+    def count(self) -> int:
+        """Total number of notes."""
+        return sum(s["count"] for s in self._segments)
+
+    def notes(self) -> list[str]:
+        """Return every note, oldest first."""
+        # Under the lock so a compaction can't delete a segment mid-read.
+        with self._lock:
+            notes: list[str] = []
+            for segment in self._segments:
+                if segment["count"]:
+                    notes.extend(_read_segment(self._path(segment)))
+            return notes
+
+    def recent(self, n: int) -> list[tuple[int, str]]:
+        """Return the last ``n`` notes as ``(number, note)``, oldest first.
+
+        Reads segments from the newest backwards and stops as soon as it
+        has ``n`` notes, usually after the active segment alone.
+        """
+        with self._lock:
+            notes: list[str] = []
+            for segment in reversed(self._segments):
+                if len(notes) >= n:
+                    break
+                if segment["count"]:
+                    notes = _tail_segment(self._path(segment),
+                                          n - len(notes)) + notes
+            first = self.count() - len(notes) + 1
+        return list(enumerate(notes, start=first))
+
+    # -- compaction ---------------------------------------------------
+
+    def maybe_compact(self) -> threading.Thread | None:
+        """Start a background compaction if enough segments are sealed.
+
+        Nothing is started unless some neighbours can actually be merged,
+        so a history of full-size segments doesn't spawn idle threads.
+        """
+        with self._lock:
+            sealed = self._segments[:-1]
+            if (len(sealed) < self.compact_after
+                    or not self._merge_groups(sealed)):
+                return None
+            if self._compactor is not None and self._compactor.is_alive():
+                return None
+            self._compactor = threading.Thread(
+                target=self.compact, daemon=True, name="notes-compaction")
+            self._compactor.start()
+            return self._compactor
+
+    def compact(self) -> None:
+        """Merge runs of small sealed segments into larger ones."""
+        with self._lock:
+            groups = self._merge_groups(self._segments[:-1])
+        for group in groups:
+            self._merge(group)
+
+    def _merge_groups(self, sealed: list[dict]) -> list[list[dict]]:
+        """Runs of two or more neighbours that fit in ``compact_size``."""
+        # Group neighbouring segments until a group would be too large.
+        groups: list[list[dict]] = [[]]
+        size = 0
+        for segment in sealed:
+            seg_size = self._size(segment)
+            if groups[-1] and size + seg_size > self.compact_size:
+                groups.append([])
+                size = 0
+            groups[-1].append(segment)
+            size += seg_size
+        return [group for group in groups if len(group) > 1]
+
+    def _merge(self, group: list[dict]) -> None:
+        # Copy the group into a fresh file outside the lock: sealed
+        # segments never change, and appends only touch the active one.
+        with self._lock:
+            merged = {"name": self._new_segment_name(),
+                      "count": sum(s["count"] for s in group),
+                      "size": sum(s["size"] for s in group)}
+        path = self._path(merged)
+        tmp = path.with_suffix(".tmp")
+        with tmp.open("wb") as out:
+            for segment in group:
+                with self._path(segment).open("rb") as f:
+                    while chunk := f.read(1 << 20):
+                        out.write(chunk)
+            out.flush()
+            os.fsync(out.fileno())
+
+        with self._lock:
+            os.replace(tmp, path)
+            start = self._segments.index(group[0])
+            self._segments[start:start + len(group)] = [merged]
+            self._save()
+            # Only delete once the manifest no longer lists the old files.
+            for segment in group:
+                self._path(segment).unlink(missing_ok=True)
+
+    def wait_for_compaction(self, timeout: float | None = None) -> None:
+        """Block until a running background compaction finishes."""
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join(timeout)
@@ -1,9 +1,14 @@
 """A minimal, clean note-taking CLI.
 
-This script stores notes in a file named ``notes.txt`` located in the
-same directory as this script. It provides two simple operations:
-- add a note (appends a line to the file)
-- view notes (prints numbered lines)
+This script stores notes in a ``notes.d`` directory located next to
+this script (see ``note_store.SegmentedNoteStore``): notes go into
+size-capped segment files, so startup and "view recent" stay fast no
+matter how long the history gets. It provides three simple operations:
+- add a note (appends a line to the newest segment)
+- view notes (prints all notes, numbered)
+- view recent notes (prints the last few, reading only the newest segment)
+
+A ``notes.txt`` from older versions is moved into the store on first run.
 
 The implementation focuses on clarity and robust, user-friendly I/O
 and error messages.
@@ -11,17 +16,41 @@ and error messages.
 
 from pathlib import Path
 
+from note_store import SegmentedNoteStore
+
 
-# Default storage file: "notes.txt" next to this script.
+# Default storage: "notes.d" next to this script.
+NOTES_DIR = Path(__file__).with_name("notes.d")
+
+# Single-file storage used by older versions; imported on first run.
 NOTES_FILE = Path(__file__).with_name("notes.txt")
 
+# How many notes "View recent notes" shows.
+RECENT_COUNT = 10
+
 
-def add_note(file_path: Path) -> None:
-    """Prompt for a single-line note and append it to ``file_path``.
+def open_store(directory: Path = NOTES_DIR,
+               legacy_file: Path = NOTES_FILE) -> SegmentedNoteStore | None:
+    """Open the note store, importing ``legacy_file`` if it is new.
+
+    Returns None (after printing why) if the store can't be opened.
+    """
+    try:
+        store = SegmentedNoteStore(directory)
+        if not store.count() and legacy_file.exists():
+            store.import_file(legacy_file)
+        return store
+    except (OSError, ValueError) as e:
+        print(f"Error: could not open notes in {directory}: {e}")
+        return None
+
+
+def add_note(store: SegmentedNoteStore) -> None:
+    """Prompt for a single-line note and append it to ``store``.
 
     - Trims surrounding whitespace from the user's input.
     - Skips saving when the user submits an empty note.
-    - Ensures the parent directory exists before writing.
+    - Rejects notes containing line breaks (e.g. pasted "\\f" or "\\u2028").
     - Catches and reports file system errors (permissions, disk full, etc.).
     """
 
@@ -34,48 +63,62 @@ def add_note(file_path: Path) -> None:
         return
 
     try:
-        # Create parent directories if they don't exist (no-op otherwise).
-        file_path.parent.mkdir(parents=True, exist_ok=True)
-
-        # Open the file in append mode and write the note with a newline.
-        with file_path.open("a", encoding="utf-8") as f:
-            f.write(note + "\n")
+        # Append to the newest segment (a new one is started when full).
+        store.append(note)
 
         # Let the user know the write succeeded.
         print("Note saved.")
+    except ValueError:
+        # The note contains a character that splits it into several lines.
+        print("Error: a note must be a single line. Nothing saved.")
     except OSError as e:
         # Provide an informative error message for common I/O failures.
-        print(f"Error: could not write to {file_path}: {e}")
+        print(f"Error: could not write to {store.directory}: {e}")
 
 
-def view_notes(file_path: Path) -> None:
-    """Read and print all notes from ``file_path``, numbered.
+def view_notes(store: SegmentedNoteStore) -> None:
+    """Read and print all notes from ``store``, numbered.
 
-    - If the file doesn't exist or is empty, prints a friendly message.
-    - Uses ``rstrip('\n')`` to avoid printing extra blank lines.
+    - If there are no notes yet, prints a friendly message.
     - Catches and reports unexpected I/O errors.
     """
 
-    # If there's no file yet, the user has no notes saved.
-    if not file_path.exists():
+    try:
+        notes = store.notes()
+    except OSError as e:
+        print(f"Error: could not read {store.directory}: {e}")
+        return
+
+    # If the store is empty, tell the user rather than printing nothing.
+    if not notes:
         print("No notes yet.")
         return
 
+    # Print each saved note preceded by its number.
+    for i, note in enumerate(notes, start=1):
+        print(f"{i}. {note}")
+
+
+def view_recent_notes(store: SegmentedNoteStore,
+                      count: int = RECENT_COUNT) -> None:
+    """Print the last ``count`` notes with their numbers.
+
+    Only the newest segment(s) are read, so this is fast even with a
+    long history.
+    """
+
     try:
-        # Read all lines and strip trailing newlines for neat printing.
-        with file_path.open("r", encoding="utf-8") as f:
-            lines = [line.rstrip("\n") for line in f]
-
-        # If the file is empty, tell the user rather than printing nothing.
-        if not lines:
-            print("No notes yet.")
-            return
-
-        # Print each saved note preceded by a line number.
-        for i, line in enumerate(lines, start=1):
-            print(f"{i}. {line}")
+        recent = store.recent(count)
     except OSError as e:
-        print(f"Error: could not read {file_path}: {e}")
+        print(f"Error: could not read {store.directory}: {e}")
+        return
+
+    if not recent:
+        print("No notes yet.")
+        return
+
+    for i, note in recent:
+        print(f"{i}. {note}")
 
 
 def main() -> None:
@@ -85,26 +128,35 @@ def main() -> None:
     Input is read as strings and validated via explicit comparisons.
     """
 
+    store = open_store()
+    if store is None:
+        return
+
     while True:
         # Display the menu options each loop iteration.
         print("\n1. Add a note")
         print("2. View notes")
-        print("3. Exit")
+        print("3. View recent notes")
+        print("4. Exit")
 
         # Read the user's choice and trim whitespace.
-        choice = input("Choose an option (1-3): ").strip()
+        choice = input("Choose an option (1-4): ").strip()
 
         # Route the chosen command to the corresponding handler.
         if choice == "1":
-            add_note(NOTES_FILE)
+            add_note(store)
         elif choice == "2":
-            view_notes(NOTES_FILE)
+            view_notes(store)
         elif choice == "3":
+            view_recent_notes(store)
+        elif choice == "4":
+            # Let a running compaction finish so its files are tidy.
+            store.wait_for_compaction()
             print("Goodbye.")
             break
         else:
             # Helpful guidance when input is not recognized.
-            print("Invalid choice. Please enter 1, 2, or 3.")
+            print("Invalid choice. Please enter 1, 2, 3, or 4.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,119 @@
+"""Tests for the segmented note store.
+
+Run from this directory:
+
+    python -m unittest test_note_store
+"""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from note_store import MANIFEST, SegmentedNoteStore
+
+
+def note(i: int) -> str:
+    return f"note number {i:04d}"  # 16 bytes + "\n"
+
+
+class TestSegmentedNoteStore(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.directory = Path(self._tmp.name) / "notes.d"
+
+    def open(self, **kwargs):
+        # Three notes per segment; no compaction unless asked for.
+        kwargs.setdefault("segment_size", 50)
+        kwargs.setdefault("compact_after", 1000)
+        store = SegmentedNoteStore(self.directory, **kwargs)
+        self.addCleanup(store.wait_for_compaction)
+        return store
+
+    def test_append_rolls_over_and_reopens(self):
+        store = self.open()
+        numbers = [store.append(note(i)) for i in range(10)]
+        self.assertEqual(numbers, list(range(1, 11)))
+        # 3 + 3 + 3 sealed, 1 in the active segment.
+        self.assertEqual([s["count"] for s in store._segments], [3, 3, 3, 1])
+        self.assertEqual(store.notes(), [note(i) for i in range(10)])
+
+        reopened = self.open()
+        self.assertEqual(reopened.count(), 10)
+        self.assertEqual(reopened.append(note(10)), 11)
+        self.assertEqual(reopened.notes(), [note(i) for i in range(11)])
+
+    def test_rejects_empty_and_multi_line_notes(self):
+        store = self.open()
+        for bad in ("", "two\nlines", "form\x0cfeed", "para\u2029graph"):
+            with self.subTest(bad=bad), self.assertRaises(ValueError):
+                store.append(bad)
+        self.assertEqual(store.count(), 0)
+
+    def test_recent_spans_segments(self):
+        store = self.open()
+        for i in range(10):
+            store.append(note(i))
+        self.assertEqual(store.recent(5),
+                         [(i + 1, note(i)) for i in range(5, 10)])
+        self.assertEqual(store.recent(1), [(10, note(9))])
+        self.assertEqual(store.recent(50),
+                         [(i + 1, note(i)) for i in range(10)])
+        self.assertEqual(self.open().recent(5), store.recent(5))
+
+    def test_compaction_keeps_notes_and_survives_reopen(self):
+        store = self.open(compact_after=4, compact_size=120)
+        for i in range(40):
+            store.append(note(i))
+            store.wait_for_compaction()
+        sealed = store._segments[:-1]
+        # Neighbours were merged up to compact_size (two 51-byte segments).
+        self.assertLess(len(sealed), 13)
+        self.assertTrue(all(s["size"] <= 120 for s in sealed))
+        self.assertEqual(store.notes(), [note(i) for i in range(40)])
+
+        reopened = self.open(compact_after=4, compact_size=120)
+        self.assertEqual(reopened.notes(), [note(i) for i in range(40)])
+        # Merged-away segments are gone; only listed ones remain.
+        on_disk = {p.name for p in self.directory.iterdir()} - {MANIFEST}
+        self.assertLessEqual(on_disk,
+                             {s["name"] for s in reopened._segments})
+
+    def test_no_compaction_when_nothing_can_merge(self):
+        store = self.open(compact_after=2, compact_size=60)
+        for i in range(12):
+            store.append(note(i))
+        # Every sealed segment is 51 bytes: no two fit in 60.
+        self.assertIsNone(store.maybe_compact())
+
+    def test_leftovers_of_interrupted_compaction_are_removed(self):
+        store = self.open()
+        for i in range(7):
+            store.append(note(i))
+        (self.directory / "00000099.seg").write_text("orphan\n")
+        (self.directory / "00000100.tmp").write_text("half a merge\n")
+        (self.directory / (MANIFEST + ".tmp")).write_text("{")
+
+        reopened = self.open()
+        self.assertEqual(reopened.notes(), [note(i) for i in range(7)])
+        self.assertEqual(sorted(self.directory.glob("*.tmp")), [])
+        self.assertFalse((self.directory / "00000099.seg").exists())
+
+    def test_imports_legacy_notes_file(self):
+        legacy = Path(self._tmp.name) / "notes.txt"
+        legacy.write_text("first\nsecond\nthird", encoding="utf-8")
+        store = self.open()
+        store.import_file(legacy)
+        self.assertFalse(legacy.exists())
+        self.assertEqual(store.append("fourth"), 4)
+        self.assertEqual(store.notes(), ["first", "second", "third",
+                                         "fourth"])
+        self.assertEqual(self.open().recent(2), [(3, "third"),
+                                                 (4, "fourth")])
+        with self.assertRaises(ValueError):
+            store.import_file(legacy)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,242 @@
+"""Flashcard decks loaded from CSV/JSON, cached as binary snapshots.
+
+Parsing a large deck on every launch is slow, so the first load compiles
+it into a snapshot next to the deck (``<deck>.snap``):
+
+    header         magic, deck size, deck mtime, deck hash, card count
+    offset array   2 * count uint64 offsets (question, answer per card)
+    string table   each string as a uint32 byte length + UTF-8 bytes
+
+Later loads memory-map the snapshot and return a ``SnapshotDeck``, a
+read-only sequence of ``(question, answer)`` pairs that decodes a card
+only when it is accessed. ``random.sample(deck, k)`` therefore touches
+just the ``k`` cards it picks, however large the deck is.
+
+The snapshot is rebuilt when the deck changes: a matching size and mtime
+is trusted as is; otherwise the deck is hashed, and only a changed hash
+means re-parsing (an unchanged one just refreshes the stored mtime).
+When the snapshot can't be written (a read-only or shared directory),
+the parsed cards are returned as a plain list instead.
+
+Deck formats:
+- CSV: two columns, question then answer; a ``question,answer`` header
+  row is optional
+- JSON: an object ``{"question": "answer", ...}`` or a list of
+  ``{"question": ..., "answer": ...}`` objects
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+import mmap
+import os
+import struct
+from array import array
+from collections.abc import Sequence
+from hashlib import blake2b
+from pathlib import Path
+
+
+SUFFIX = ".snap"
+_MAGIC = b"DECK1\0\0\0"
+# magic, deck size, deck mtime_ns, deck hash, card count
+_HEADER = struct.Struct("<8sQq16sQ")
+_LENGTH = struct.Struct("<I")
+
+
+def _hash_file(path: Path) -> bytes:
+    h = blake2b(digest_size=16)
+    with path.open("rb") as f:
+        while chunk := f.read(1 << 20):
+            h.update(chunk)
+    return h.digest()
+
+
+def snapshot_path(deck_path: Path) -> Path:
+    """Where the snapshot of ``deck_path`` is stored."""
+    return deck_path.with_name(deck_path.name + SUFFIX)
+
+
+def load_deck(path: Path) -> list[tuple[str, str]]:
+    """Parse a CSV or JSON deck into ``(question, answer)`` pairs.
+
+    Blank rows are skipped and surrounding whitespace is trimmed.
+
+    Raises:
+        ValueError: if the format is unknown or a card is malformed.
+        OSError: if the file can't be read.
+    """
+    suffix = path.suffix.lower()
+    if suffix == ".csv":
+        with path.open("r", encoding="utf-8", newline="") as f:
+            rows = [row for row in csv.reader(f) if "".join(row).strip()]
+        header = [c.strip().lower() for c in rows[0]] if rows else []
+        if header == ["question", "answer"]:
+            rows = rows[1:]
+    elif suffix == ".json":
+        with path.open("r", encoding="utf-8") as f:
+            try:
+                data = json.load(f)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}: invalid JSON: {e}") from None
+        if isinstance(data, dict):
+            rows = list(data.items())
+        elif isinstance(data, list):
+            try:
+                rows = [(card["question"], card["answer"]) for card in data]
+            except (KeyError, TypeError):
+                raise ValueError(
+                    f"{path}: each card needs 'question' and 'answer'"
+                ) from None
+        else:
+            raise ValueError(f"{path}: expected a JSON object or list")
+    else:
+        raise ValueError(f"{path}: unknown deck format (use .csv or .json)")
+
+    cards = []
+    for row in rows:
+        if len(row) != 2 or not all(isinstance(c, str) for c in row):
+            raise ValueError(f"{path}: bad card {row!r}")
+        question, answer = row[0].strip(), row[1].strip()
+        if question:
+            cards.append((question, answer))
+    return cards
+
+
+def write_snapshot(cards: list[tuple[str, str]], path: Path, size: int,
+                   mtime_ns: int, digest: bytes) -> None:
+    """Write ``cards`` as a snapshot stamped with the deck's identity."""
+    offsets = array("Q")
+    table = bytearray()
+    base = _HEADER.size + 8 * 2 * len(cards)
+    for card in cards:
+        for text in card:
+            data = text.encode("utf-8")
+            offsets.append(base + len(table))
+            table += _LENGTH.pack(len(data))
+            table += data
+
+    tmp = path.with_name(path.name + ".tmp")
+    try:
+        with tmp.open("wb") as f:
+            f.write(_HEADER.pack(_MAGIC, size, mtime_ns, digest,
+                                 len(cards)))
+            offsets.tofile(f)
+            f.write(table)
+        os.replace(tmp, path)
+    except OSError:
+        if tmp.is_file():
+            tmp.unlink(missing_ok=True)
+        raise
+
+
+class SnapshotDeck(Sequence):
+    """A deck snapshot as a lazy sequence of ``(question, answer)``.
+
+    Use as a context manager (or call ``close()``) to release the mapping.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        with path.open("rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            (magic, self.deck_size, self.deck_mtime_ns, self.deck_hash,
+             self._count) = _HEADER.unpack_from(self._map)
+        except struct.error:
+            magic = None
+        if magic != _MAGIC:
+            self._map.close()
+            raise ValueError(f"{path} is not a deck snapshot")
+        if not self._body_fits():
+            self._map.close()
+            raise ValueError(f"{path} is truncated or corrupt")
+
+    def _body_fits(self) -> bool:
+        """Check the file size against the card count.
+
+        The offsets must fit, and the last string (strings are written in
+        order) must end exactly at the end of the file.
+        """
+        table = _HEADER.size + 8 * 2 * self._count
+        if table > len(self._map):
+            return False
+        if not self._count:
+            return table == len(self._map)
+        (offset,) = struct.unpack_from("<Q", self._map, table - 8)
+        if not table <= offset <= len(self._map) - _LENGTH.size:
+            return False
+        (length,) = _LENGTH.unpack_from(self._map, offset)
+        return offset + _LENGTH.size + length == len(self._map)
+
+    def __enter__(self) -> SnapshotDeck:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._map.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _string(self, slot: int) -> str:
+        (offset,) = struct.unpack_from("<Q", self._map,
+                                       _HEADER.size + 8 * slot)
+        (length,) = _LENGTH.unpack_from(self._map, offset)
+        start = offset + _LENGTH.size
+        return self._map[start:start + length].decode("utf-8")
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("card index out of range")
+        return self._string(2 * index), self._string(2 * index + 1)
+
+
+def open_deck(deck_path: Path) -> SnapshotDeck | list[tuple[str, str]]:
+    """Return the deck at ``deck_path``, (re)building its snapshot if needed.
+
+    If the snapshot can't be written, the parsed cards are returned as a
+    list (no cache, but the deck is still usable).
+
+    Raises:
+        ValueError: if the deck can't be parsed.
+        OSError: if the deck can't be read.
+    """
+    st = os.stat(deck_path)
+    snap = snapshot_path(deck_path)
+    digest = None
+    try:
+        deck = SnapshotDeck(snap)
+    except (OSError, ValueError):
+        deck = None
+    if deck is not None:
+        if (deck.deck_size, deck.deck_mtime_ns) == (st.st_size,
+                                                    st.st_mtime_ns):
+            return deck
+        digest = _hash_file(deck_path)
+        if deck.deck_hash == digest:
+            # Touched but not changed: just record the new mtime.
+            try:
+                with snap.open("r+b") as f:
+                    f.write(_HEADER.pack(_MAGIC, st.st_size, st.st_mtime_ns,
+                                         digest, len(deck)))
+            except OSError:
+                return deck  # still valid; it will be hashed again
+            deck.close()
+            return SnapshotDeck(snap)
+        deck.close()
+
+    cards = load_deck(deck_path)
+    try:
+        write_snapshot(cards, snap, st.st_size, st.st_mtime_ns,
+                       digest or _hash_file(deck_path))
+    except OSError:
+        return cards  # a read-only directory just means no snapshot
+    return SnapshotDeck(snap)
@@ -3,9 +3,18 @@
 Stores a set of question->answer pairs and quizzes the user by selecting
 random cards without replacement. Comparison is case-insensitive and
 whitespace is trimmed.
+
+Cards come from the built-in ``FLASHCARDS`` or from a CSV/JSON deck
+(``--deck``), which is cached as a memory-mapped snapshot so even large
+decks start instantly (see ``deck_snapshot``).
 """
 
+import argparse
 import random
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+
+from deck_snapshot import SnapshotDeck, open_deck
 
 
 FLASHCARDS: dict[str, str] = {
@@ -30,14 +39,22 @@ def ask_question(question: str, answer: str) -> bool:
     return False
 
 
-def run_quiz(cards: dict[str, str], max_questions: int = 5) -> None:
-    """Run a quiz using up to `max_questions` randomly selected cards."""
+def run_quiz(cards: Mapping[str, str] | Sequence[tuple[str, str]],
+             max_questions: int = 5) -> None:
+    """Run a quiz using up to `max_questions` randomly selected cards.
+
+    `cards` is a question->answer mapping or a sequence of
+    (question, answer) pairs; a sequence is sampled directly, so a lazy
+    deck only loads the cards that are asked.
+    """
     if not cards:
         print("No flashcards available.")
         return
 
+    if isinstance(cards, Mapping):
+        cards = list(cards.items())
     num_questions = min(max_questions, len(cards))
-    selected = random.sample(list(cards.items()), k=num_questions)
+    selected = random.sample(cards, k=num_questions)
 
     score = 0
     for question, answer in selected:
@@ -46,8 +63,44 @@ def run_quiz(cards: dict[str, str], max_questions: int = 5) -> None:
     print(f"Score: {score} / {num_questions}")
 
 
+def parse_args() -> argparse.Namespace:
+    """Parse command-line arguments for the script."""
+    parser = argparse.ArgumentParser(description="Run a flashcard quiz.")
+    parser.add_argument("--deck", type=Path,
+                        help="CSV or JSON deck to quiz from "
+                             "(default: the built-in cards).")
+    parser.add_argument("--questions", type=int, default=5,
+                        help="Number of questions to ask "
+                             "(default: %(default)s).")
+
+    args = parser.parse_args()
+    if args.questions < 1:
+        parser.error("--questions must be at least 1")
+    return args
+
+
 def main() -> None:
-    run_quiz(FLASHCARDS)
+    args = parse_args()
+    if args.deck is None:
+        run_quiz(FLASHCARDS, args.questions)
+        return
+
+    try:
+        deck = open_deck(args.deck)
+    except FileNotFoundError:
+        print(f"Error: The deck '{args.deck}' does not exist.")
+        return
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+    except OSError as e:
+        print(f"Error: Could not load deck '{args.deck}': {e}")
+        return
+    if isinstance(deck, SnapshotDeck):
+        with deck:
+            run_quiz(deck, args.questions)
+    else:
+        run_quiz(deck, args.questions)  # parsed, but not cached
 
 
 if __name__ == "__main__":
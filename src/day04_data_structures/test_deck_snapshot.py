@@ -0,0 +1,117 @@
+"""Tests for flashcard deck loading and snapshots.
+
+Run from this directory:
+
+    python -m unittest test_deck_snapshot
+"""
+
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import deck_snapshot
+from deck_snapshot import SnapshotDeck, load_deck, open_deck, snapshot_path
+
+
+CARDS = [("What is Python?", "A programming language"),
+         ("Größe?", "size, with ümlauts"),
+         ("Empty answer", "")]
+
+
+def write_csv(path: Path, cards) -> None:
+    lines = ["question,answer"] + [f'"{q}","{a}"' for q, a in cards]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+class TestLoadDeck(unittest.TestCase):
+
+    def test_csv_and_json_forms_agree(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = Path(tmp) / "deck.csv"
+            write_csv(csv_path, CARDS)
+            as_object = Path(tmp) / "object.json"
+            as_object.write_text(json.dumps(dict(CARDS)), encoding="utf-8")
+            as_list = Path(tmp) / "list.json"
+            as_list.write_text(json.dumps(
+                [{"question": q, "answer": a} for q, a in CARDS]),
+                encoding="utf-8")
+            for path in (csv_path, as_object, as_list):
+                with self.subTest(path=path.name):
+                    self.assertEqual(load_deck(path), CARDS)
+
+    def test_bad_decks_raise_value_error(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cases = {"deck.txt": "q,a\n", "deck.json": "{not json",
+                     "cards.json": '[{"question": "q"}]',
+                     "rows.csv": "q,a,extra\n"}
+            for name, text in cases.items():
+                path = Path(tmp) / name
+                path.write_text(text, encoding="utf-8")
+                with self.subTest(name=name), self.assertRaises(ValueError):
+                    load_deck(path)
+
+
+class TestOpenDeck(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.deck = Path(tmp.name) / "deck.csv"
+        write_csv(self.deck, CARDS)
+
+    def open(self):
+        deck = open_deck(self.deck)
+        if isinstance(deck, SnapshotDeck):
+            self.addCleanup(deck.close)
+        return deck
+
+    def test_snapshot_is_built_then_reused(self):
+        deck = self.open()
+        self.assertIsInstance(deck, SnapshotDeck)
+        self.assertEqual(list(deck), CARDS)
+        self.assertEqual(deck[-1], CARDS[-1])
+        self.assertTrue(snapshot_path(self.deck).exists())
+        with mock.patch.object(deck_snapshot, "load_deck") as load:
+            self.assertEqual(list(self.open()), CARDS)
+            load.assert_not_called()
+
+    def test_rebuilt_when_the_deck_changes(self):
+        self.open().close()
+        changed = CARDS + [("New card?", "Yes")]
+        write_csv(self.deck, changed)
+        self.assertEqual(list(self.open()), changed)
+
+    def test_touched_deck_only_refreshes_mtime(self):
+        self.open().close()
+        st = os.stat(self.deck)
+        os.utime(self.deck, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        with mock.patch.object(deck_snapshot, "load_deck") as load:
+            deck = self.open()
+            load.assert_not_called()
+        self.assertEqual(list(deck), CARDS)
+        self.assertEqual(deck.deck_mtime_ns, os.stat(self.deck).st_mtime_ns)
+
+    def test_corrupt_snapshot_is_rebuilt(self):
+        self.open().close()
+        snap = snapshot_path(self.deck)
+        data = snap.read_bytes()
+        for cut in (1, 8, len(data) - 10):
+            snap.write_bytes(data[:-cut])
+            with self.subTest(cut=cut):
+                with self.assertRaises(ValueError):
+                    SnapshotDeck(snap)
+                self.assertEqual(list(self.open()), CARDS)
+
+    def test_unwritable_snapshot_falls_back_to_cards(self):
+        # A directory in the way makes writing the snapshot fail.
+        self.deck.with_name(self.deck.name + ".snap.tmp").mkdir()
+        deck = self.open()
+        self.assertEqual(deck, CARDS)
+        self.assertFalse(snapshot_path(self.deck).exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
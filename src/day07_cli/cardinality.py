@@ -0,0 +1,156 @@
+"""Distinct-word counting with bounded memory.
+
+Provides:
+- ``HyperLogLog``: a fixed-size cardinality sketch that can be merged
+  across shards and files and serialized to bytes
+- ``UniqueCounter``: exact counting with a ``set`` for small inputs that
+  switches to a HyperLogLog sketch once a threshold is crossed
+
+Words are hashed with BLAKE2b rather than the built-in ``hash()``, which
+is salted per process, so sketches built in different runs or on
+different machines stay compatible and can be merged.
+"""
+
+from __future__ import annotations
+
+import math
+from hashlib import blake2b
+from itertools import islice
+from typing import Iterable
+
+
+# Number of distinct words kept exactly before switching to HyperLogLog.
+DEFAULT_EXACT_LIMIT = 100_000
+
+# 2**14 registers -> 16 KiB of state and ~0.8% standard error.
+DEFAULT_PRECISION = 14
+
+# Words moved into the exact set per step, so the limit is checked often.
+_BATCH_SIZE = 4096
+
+_MAGIC = b"HLL1"
+
+
+def _hash64(word: str) -> int:
+    """Return a stable 64-bit hash of ``word``."""
+    digest = blake2b(word.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+class HyperLogLog:
+    """Cardinality estimator using ``2 ** precision`` one-byte registers."""
+
+    def __init__(self, precision: int = DEFAULT_PRECISION) -> None:
+        if not 4 <= precision <= 18:
+            raise ValueError("precision must be between 4 and 18")
+        self.precision = precision
+        self.num_registers = 1 << precision
+        self.registers = bytearray(self.num_registers)
+
+    def add(self, word: str) -> None:
+        """Add a single word to the sketch."""
+        self._add_hash(_hash64(word))
+
+    def update(self, words: Iterable[str]) -> None:
+        """Add every word from ``words`` to the sketch."""
+        for word in words:
+            self._add_hash(_hash64(word))
+
+    def _add_hash(self, h: int) -> None:
+        # The low bits pick a register; the rank of the remaining bits
+        # (position of the first 1-bit) is what the register remembers.
+        index = h & (self.num_registers - 1)
+        rest = h >> self.precision
+        width = 64 - self.precision
+        rank = width - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: HyperLogLog) -> None:
+        """Fold ``other`` into this sketch (register-wise maximum)."""
+        if other.precision != self.precision:
+            raise ValueError("cannot merge sketches with different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def estimate(self) -> int:
+        """Return the estimated number of distinct words added."""
+        m = self.num_registers
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+
+        # Small-range correction: fall back to linear counting while
+        # many registers are still empty.
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            return round(m * math.log(m / zeros))
+        return round(raw)
+
+    def to_bytes(self) -> bytes:
+        """Serialize the sketch so it can be stored or sent between shards."""
+        return _MAGIC + bytes([self.precision]) + bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> HyperLogLog:
+        """Rebuild a sketch produced by ``to_bytes``."""
+        if data[:4] != _MAGIC:
+            raise ValueError("not a HyperLogLog sketch")
+        sketch = cls(data[4])
+        if len(data) != 5 + sketch.num_registers:
+            raise ValueError("truncated HyperLogLog sketch")
+        sketch.registers = bytearray(data[5:])
+        return sketch
+
+
+class UniqueCounter:
+    """Count distinct words exactly, then estimate past ``exact_limit``.
+
+    While fewer than ``exact_limit`` distinct words have been seen, they
+    are kept in a set and ``count()`` is exact. After that the set is
+    replayed into a HyperLogLog sketch and dropped, so memory stays at a
+    few KiB no matter how large the corpus grows.
+    """
+
+    def __init__(self, exact_limit: int = DEFAULT_EXACT_LIMIT,
+                 precision: int = DEFAULT_PRECISION) -> None:
+        self.exact_limit = exact_limit
+        self.precision = precision
+        self.words: set[str] | None = set()
+        self.sketch: HyperLogLog | None = None
+
+    @property
+    def is_exact(self) -> bool:
+        """True while the count is still exact."""
+        return self.sketch is None
+
+    def update(self, words: Iterable[str]) -> None:
+        """Add every word from ``words``."""
+        it = iter(words)
+        while batch := list(islice(it, _BATCH_SIZE)):
+            if self.sketch is not None:
+                # Hash each distinct word of the batch once, not every
+                # occurrence: text repeats its common words constantly.
+                self.sketch.update(set(batch))
+                continue
+            self.words.update(batch)
+            if len(self.words) > self.exact_limit:
+                self._switch_to_sketch()
+
+    def _switch_to_sketch(self) -> None:
+        self.sketch = HyperLogLog(self.precision)
+        self.sketch.update(self.words)
+        self.words = None
+
+    def merge(self, other: UniqueCounter) -> None:
+        """Fold the words counted by ``other`` into this counter."""
+        if other.sketch is None:
+            self.update(other.words)
+            return
+        if self.sketch is None:
+            self._switch_to_sketch()
+        self.sketch.merge(other.sketch)
+
+    def count(self) -> int:
+        """Return the (possibly estimated) number of distinct words."""
+        if self.sketch is None:
+            return len(self.words)
+        return self.sketch.estimate()
@@ -0,0 +1,380 @@
+"""Sparse word co-occurrence counts within a +/- ``window`` token window.
+
+Words are mapped to dense IDs with a ``Vocabulary``. Every pair of IDs
+at most ``window`` tokens apart is packed into one 64-bit key
+(``row << 32 | col``, both directions) and appended to a chunked COO
+buffer. When the buffer holds ``flush_pairs`` keys it is sort-reduced
+(sorted, equal keys summed) into the running table, which therefore
+stays sorted by row and then column: it *is* a CSR matrix once the row
+pointers are computed by ``to_csr()``.
+
+Partial matrices are mergeable, so a large file can be split into
+shards at line starts and counted by several processes with
+``cooccurrence_file()``; the merged result equals a single pass.
+
+With NumPy installed buffers and the table are NumPy arrays and a reduce
+is a vectorized sort plus ``add.reduceat``. Without it the same API falls
+back to dicts and ``array`` buffers.
+"""
+
+from __future__ import annotations
+
+import heapq
+import os
+from array import array
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterable, NamedTuple
+
+from line_index import LineIndex, iter_range
+from streaming import DEFAULT_CHUNK_SIZE, TextStats, analyze_chunks
+from text_utils import normalize_word
+from vocab import IdCounter
+
+try:
+    import numpy as np
+except ImportError:  # optional: pure-Python fallback below
+    np = None
+
+
+ID_BITS = 32
+_ID_MASK = (1 << ID_BITS) - 1
+
+DEFAULT_WINDOW = 2
+DEFAULT_FLUSH_PAIRS = 1 << 22
+
+# Bytes read at a time when looking past a shard's end for context words.
+_LOOKAHEAD_STEP = 4096
+
+
+class CsrMatrix(NamedTuple):
+    """Co-occurrence counts in CSR form: row ``i`` (word ``words[i]``)
+    has columns ``indices[indptr[i]:indptr[i + 1]]`` with counts in the
+    same slice of ``data``. Arrays are NumPy arrays when available,
+    else ``array`` objects."""
+    words: list[str]
+    indptr: object
+    indices: object
+    data: object
+
+
+class CooccurrenceMatrix:
+    """Count how often words appear within ``window`` tokens of each other.
+
+    Feed words with ``update()`` (it is a ``TextStats`` word sink); the
+    window carries over between calls. ``X[a][b]`` counts the positions
+    of ``b`` within ``window`` tokens of each occurrence of ``a``, so the
+    matrix is symmetric.
+    """
+
+    def __init__(self, window: int = DEFAULT_WINDOW,
+                 flush_pairs: int = DEFAULT_FLUSH_PAIRS) -> None:
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        self.window = window
+        self.flush_pairs = flush_pairs
+        self.word_counts = IdCounter()
+        self.vocab = self.word_counts.vocab
+
+        self._tail = array("I")  # last ``window`` IDs, for the next call
+        self._pending: list = []
+        self._pending_size = 0
+        if np is not None:
+            self._keys = np.zeros(0, dtype=np.uint64)
+            self._values = np.zeros(0, dtype=np.int64)
+        else:
+            self._table: dict[int, int] = {}
+
+    def break_sequence(self) -> None:
+        """Start a fresh window so no pair spans the break."""
+        self._tail = array("I")
+
+    def update(self, words: Iterable[str]) -> None:
+        """Count ``words`` and every pair they form within the window."""
+        ids = self.vocab.encode(words)
+        self.word_counts.add_ids(ids)
+        self._add_pairs(ids)
+
+    def add_context(self, words: Iterable[str]) -> None:
+        """Count pairs between the words seen so far and ``words``.
+
+        ``words`` themselves are not counted and do not pair with each
+        other; a shard uses this for the first words of the next shard.
+        """
+        tail = self._tail
+        self._add_pairs(self.vocab.encode(words), context=True)
+        self._tail = tail
+
+    def _add_pairs(self, ids: array, context: bool = False) -> None:
+        if not ids:
+            return
+        t = len(self._tail)
+        seq = self._tail + ids
+        for d in range(1, self.window + 1):
+            # Pairs (seq[j - d], seq[j]) whose right word is new (and, for
+            # context words, whose left word is not).
+            first = max(t, d)
+            stop = min(len(seq), t + d) if context else len(seq)
+            if first >= stop:
+                continue
+            self._push(seq[first - d:stop - d], seq[first:stop])
+        self._tail = seq[-self.window:]
+        if self._pending_size >= self.flush_pairs:
+            self._reduce()
+
+    def _push(self, left: array, right: array) -> None:
+        if np is not None:
+            a = np.frombuffer(left, dtype=np.uint32).astype(np.uint64)
+            b = np.frombuffer(right, dtype=np.uint32).astype(np.uint64)
+            self._pending.append((a << ID_BITS) | b)
+            self._pending.append((b << ID_BITS) | a)
+        else:
+            pairs = Counter(zip(left, right))
+            pairs.update(zip(right, left))
+            self._pending.append(pairs)
+        self._pending_size += 2 * len(left)
+
+    def _reduce(self) -> None:
+        """Sort-reduce the COO buffer into the table."""
+        if not self._pending:
+            return
+        if np is not None:
+            keys = np.concatenate([self._keys] + self._pending)
+            values = np.concatenate(
+                (self._values,
+                 np.ones(len(keys) - len(self._keys), dtype=np.int64)))
+            self._keys, self._values = _sum_duplicates(keys, values)
+        else:
+            table = self._table
+            for pairs in self._pending:
+                for (a, b), c in pairs.items():
+                    key = a << ID_BITS | b
+                    table[key] = table.get(key, 0) + c
+        self._pending = []
+        self._pending_size = 0
+
+    def merge(self, other: CooccurrenceMatrix) -> None:
+        """Add the counts of ``other`` (e.g. another shard) to this one.
+
+        Words new to this matrix get IDs in ``other``'s first-seen order,
+        so merging shards in file order gives the same IDs as one pass.
+        """
+        self._reduce()
+        other._reduce()
+        remap = self.vocab.encode(other.vocab.words)
+        self.word_counts.add(other.word_counts.to_dict())
+        if np is not None:
+            remap = np.frombuffer(remap, dtype=np.uint32).astype(np.uint64)
+            rows = remap[other._keys >> np.uint64(ID_BITS)]
+            cols = remap[other._keys & np.uint64(_ID_MASK)]
+            keys = np.concatenate((self._keys, (rows << ID_BITS) | cols))
+            values = np.concatenate((self._values, other._values))
+            self._keys, self._values = _sum_duplicates(keys, values)
+        else:
+            table = self._table
+            for key, c in other._table.items():
+                key = remap[key >> ID_BITS] << ID_BITS | remap[key & _ID_MASK]
+                table[key] = table.get(key, 0) + c
+
+    def _items(self) -> tuple[list[int], list[int]]:
+        """Sorted keys and their counts (pure-Python table)."""
+        keys = sorted(self._table)
+        return keys, [self._table[k] for k in keys]
+
+    def count(self, a: str, b: str) -> int:
+        """How often ``b`` occurred within the window of ``a``."""
+        i, j = self.vocab.get(a), self.vocab.get(b)
+        if i is None or j is None:
+            return 0
+        self._reduce()
+        key = i << ID_BITS | j
+        if np is not None:
+            pos = int(np.searchsorted(self._keys, np.uint64(key)))
+            found = pos < len(self._keys) and self._keys[pos] == key
+            return int(self._values[pos]) if found else 0
+        return self._table.get(key, 0)
+
+    def most_common(self, k: int = 10,
+                    min_count: int = 1) -> list[tuple[tuple[str, str], int]]:
+        """Return the ``k`` most frequent unordered word pairs.
+
+        Pairs involving a word seen fewer than ``min_count`` times are
+        skipped.
+        """
+        self._reduce()
+        freq = self.word_counts.counts()
+        if np is not None:
+            keys, values = self._keys, self._values
+            rows = (keys >> np.uint64(ID_BITS)).astype(np.int64)
+            cols = (keys & np.uint64(_ID_MASK)).astype(np.int64)
+            live = ((rows <= cols) & (freq[rows] >= min_count)
+                    & (freq[cols] >= min_count))
+            keys, values = keys[live], values[live]
+            # Most frequent first, ties by key (i.e. first-seen words).
+            order = np.lexsort((keys, -values))[:k]
+            top = zip(keys[order].tolist(), values[order].tolist())
+        else:
+            top = heapq.nsmallest(
+                k, ((key, c) for key, c in self._table.items()
+                    if key >> ID_BITS <= key & _ID_MASK
+                    and freq[key >> ID_BITS] >= min_count
+                    and freq[key & _ID_MASK] >= min_count),
+                key=lambda kc: (-kc[1], kc[0]))
+        words = self.vocab.words
+        return [((words[key >> ID_BITS], words[key & _ID_MASK]), c)
+                for key, c in top]
+
+    def to_csr(self, min_count: int = 1) -> CsrMatrix:
+        """Return the matrix in CSR form, dropping rare words.
+
+        Words seen fewer than ``min_count`` times are removed from the
+        vocabulary (rows and columns); the rest are renumbered in
+        first-seen order.
+        """
+        self._reduce()
+        freq = self.word_counts.counts()
+        if np is not None:
+            keep = freq >= min_count
+            new_id = np.cumsum(keep) - 1
+            rows = (self._keys >> np.uint64(ID_BITS)).astype(np.int64)
+            cols = (self._keys & np.uint64(_ID_MASK)).astype(np.int64)
+            live = keep[rows] & keep[cols]
+            rows, cols = new_id[rows[live]], new_id[cols[live]]
+            words = [w for w, k in zip(self.vocab.words, keep.tolist()) if k]
+            indptr = np.zeros(len(words) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(rows, minlength=len(words)),
+                      out=indptr[1:])
+            return CsrMatrix(words, indptr, cols.astype(np.uint32),
+                             self._values[live])
+
+        keys, values = self._items()
+        new_id: dict[int, int] = {}
+        words = []
+        for i, w in enumerate(self.vocab.words):
+            if freq[i] >= min_count:
+                new_id[i] = len(words)
+                words.append(w)
+        indptr, indices, data = array("Q", [0]), array("I"), array("Q")
+        row = 0
+        for key, c in zip(keys, values):
+            a, b = new_id.get(key >> ID_BITS), new_id.get(key & _ID_MASK)
+            if a is None or b is None:
+                continue
+            while row < a:
+                indptr.append(len(indices))
+                row += 1
+            indices.append(b)
+            data.append(c)
+        while row < len(words):
+            indptr.append(len(indices))
+            row += 1
+        return CsrMatrix(words, indptr, indices, data)
+
+
+def _sum_duplicates(keys, values):
+    """Sort ``keys`` and sum the ``values`` of equal keys (NumPy)."""
+    if not len(keys):
+        return keys, values
+    order = np.argsort(keys, kind="stable")
+    keys, values = keys[order], values[order]
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    return keys[starts], np.add.reduceat(values, starts)
+
+
+def _lookahead(f, start: int, count: int,
+               normalize: Callable[[str], str]) -> list[str]:
+    """Return the first ``count`` normalized words at byte ``start``."""
+    f.seek(start)
+    data = b""
+    while True:
+        more = f.read(_LOOKAHEAD_STEP)
+        data += more
+        if more:
+            # Only whole words: stop at the last ASCII whitespace byte.
+            cut = max(data.rfind(bytes([c])) for c in b" \t\n\r\v\f")
+            text = data[:cut + 1].decode("utf-8")
+        else:
+            text = data.decode("utf-8")
+        words = [w for w in map(normalize, text.split()) if w]
+        if len(words) >= count or not more:
+            return words[:count]
+
+
+def _line_start_after(f, pos: int) -> int:
+    """Offset of the first line start at or after byte ``pos`` (or EOF)."""
+    # Start one byte early: a line starting exactly at ``pos`` follows
+    # a "\n" there.
+    offset = pos - 1
+    f.seek(offset)
+    while block := f.read(_LOOKAHEAD_STEP):
+        i = block.find(b"\n")
+        if i >= 0:
+            return offset + i + 1
+        offset += len(block)
+    return offset
+
+
+def _byte_shards(path: Path, shards: int) -> list[tuple[int, int]]:
+    """Split ``path`` into up to ``shards`` byte ranges of similar size.
+
+    Each boundary is moved forward to the next line start, so no word is
+    cut; a file without newlines stays one shard.
+    """
+    size = os.stat(path).st_size
+    bounds = [0]
+    with path.open("rb") as f:
+        for i in range(1, shards):
+            target = size * i // shards
+            if target > bounds[-1]:
+                bounds.append(_line_start_after(f, target))
+    bounds.append(size)
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if a < b]
+
+
+def _count_shard(path: Path, start: int, end: int, window: int,
+                 normalizer: Callable[[str], str] | None,
+                 chunk_size: int) -> CooccurrenceMatrix:
+    matrix = CooccurrenceMatrix(window)
+    stats = TextStats(frequencies=False, sinks=[matrix],
+                      normalizer=normalizer)
+    with path.open("rb") as f:
+        analyze_chunks(iter_range(f, start, end, chunk_size), stats)
+        matrix.add_context(_lookahead(f, end, window,
+                                      normalizer or normalize_word))
+    matrix._reduce()
+    return matrix
+
+
+def cooccurrence_file(path: Path, window: int = DEFAULT_WINDOW,
+                      workers: int = 1,
+                      normalizer: Callable[[str], str] | None = None,
+                      chunk_size: int = DEFAULT_CHUNK_SIZE
+                      ) -> CooccurrenceMatrix:
+    """Count co-occurrences in ``path`` using up to ``workers`` processes.
+
+    The file is split into shards at line starts: by line count when a
+    current line index (``--index``) exists, otherwise by byte offset,
+    so no index is built or written. Each worker also reads the first
+    ``window`` words past its shard so pairs crossing a boundary are
+    counted exactly once. ``normalizer`` must be picklable when
+    ``workers > 1``.
+    """
+    index = LineIndex.open_current(path)
+    if index is not None:
+        with index:
+            shards = index.shard_ranges(max(1, workers))
+    else:
+        shards = _byte_shards(path, max(1, workers))
+    if not shards:
+        return CooccurrenceMatrix(window)
+    args = [(path, a, b, window, normalizer, chunk_size) for a, b in shards]
+    if workers <= 1 or len(shards) == 1:
+        parts = [_count_shard(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(min(workers, len(shards))) as pool:
+            parts = list(pool.map(_count_shard, *zip(*args)))
+    result = parts[0]
+    for part in parts[1:]:
+        result.merge(part)
+    return result
@@ -0,0 +1,99 @@
+"""
+Find near-duplicate text files.
+Builds a MinHash signature per file (cached next to it) and reports the
+pairs whose estimated Jaccard similarity reaches the threshold.
+"""
+
+import argparse
+from pathlib import Path
+from typing import Iterator
+from line_index import SUFFIX as INDEX_SUFFIX
+from minhash import (DEFAULT_NUM_PERM, DEFAULT_SHINGLE, DEFAULT_THRESHOLD,
+                     SUFFIX, MinHasher, find_duplicates)
+from normalize import ENGLISH_STOPWORDS, build_normalizer, load_stopwords
+
+# Files this tool (or main.py) writes next to the documents.
+SIDECAR_SUFFIXES = (SUFFIX, INDEX_SUFFIX, ".tmp")
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command-line arguments for the script."""
+    parser = argparse.ArgumentParser(
+        description="Find near-duplicate text files.")
+    parser.add_argument("paths", nargs="+", type=Path,
+                        help="Files, or directories to search recursively.")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Minimum estimated similarity, 0-1 "
+                             "(default: %(default)s).")
+    parser.add_argument("--num-perm", type=int, default=DEFAULT_NUM_PERM,
+                        help="MinHash signature length "
+                             "(default: %(default)s).")
+    parser.add_argument("--shingle", metavar="K", type=int,
+                        default=DEFAULT_SHINGLE,
+                        help="Compare runs of K words "
+                             "(default: %(default)s).")
+    parser.add_argument("--kmers", action="store_true",
+                        help="Use runs of K characters instead of words.")
+    parser.add_argument("--stopwords", metavar="FILE", nargs="?", type=Path,
+                        const=True,
+                        help="Drop stopwords first: the built-in English "
+                             "list, or one word per line from FILE.")
+    parser.add_argument("--stem", action="store_true",
+                        help="Reduce words to a simple stem first.")
+    parser.add_argument("--no-cache", dest="cache", action="store_false",
+                        help="Don't read or write .minhash signature files.")
+
+    args = parser.parse_args()
+    if not 0 < args.threshold <= 1:
+        parser.error("--threshold must be in (0, 1]")
+    if args.num_perm < 1 or args.shingle < 1:
+        parser.error("--num-perm and --shingle must be at least 1")
+    if args.stopwords is True:
+        args.stopwords = ENGLISH_STOPWORDS
+    elif args.stopwords is not None:
+        try:
+            args.stopwords = load_stopwords(args.stopwords)
+        except OSError as e:
+            parser.error(f"could not read stopwords file: {e}")
+    return args
+
+
+def iter_files(paths: list[Path]) -> Iterator[Path]:
+    """Yield the given files and the files under the given directories."""
+    for path in paths:
+        if path.is_dir():
+            for child in sorted(path.rglob("*")):
+                if child.is_file() and not child.name.endswith(
+                        SIDECAR_SUFFIXES):
+                    yield child
+        elif path.exists():
+            yield path
+        else:
+            print(f"Error: The path '{path}' does not exist.")
+
+
+def main() -> None:
+    """Entry point: parse args and print near-duplicate pairs."""
+    args = parse_args()
+    normalizer = None
+    if args.stopwords is not None or args.stem:
+        normalizer = build_normalizer(args.stopwords, args.stem)
+        # The cache doesn't record the normalizer.
+        args.cache = False
+
+    files = list(iter_files(args.paths))
+    hasher = MinHasher(args.num_perm, args.shingle, args.kmers)
+    skipped: list[Path] = []
+    pairs = find_duplicates(files, args.threshold, hasher, normalizer,
+                            args.cache, skipped)
+    for path in skipped:
+        print(f"Skipped '{path}': not readable UTF-8 text.")
+    print(f"Compared {len(files) - len(skipped)} files.")
+    for first, second, score in pairs:
+        print(f"{score:.2f}  {first}  {second}")
+    if not pairs:
+        print("No near-duplicates found.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Write full word frequency tables to CSV, NDJSON or Parquet.
+
+Rows are written most frequent first and pulled from an iterator in
+batches of ``batch_size``, so the writer never holds more than one batch
+on top of whatever the source itself needs. Combined with
+``ExternalCounter.by_count()`` the whole export stays within a fixed
+memory budget.
+
+Parquet output needs the optional ``pyarrow`` package
+(``pip install pyarrow``); CSV and NDJSON use only the standard library.
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+from itertools import islice
+from operator import itemgetter
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from streaming import TextStats
+
+
+FORMATS = ("csv", "ndjson", "parquet")
+DEFAULT_BATCH_SIZE = 65_536
+
+Row = tuple[str, int]
+
+
+def _batches(rows: Iterable[Row], size: int) -> Iterator[list[Row]]:
+    it = iter(rows)
+    while batch := list(islice(it, size)):
+        yield batch
+
+
+def frequency_rows(stats: TextStats) -> Iterator[Row]:
+    """Yield ``(word, count)`` from ``stats``, most frequent first.
+
+    Ties keep first-appearance order, as in ``most_common_word``.
+
+    Raises:
+        ValueError: if ``stats`` was not keeping a frequency table.
+    """
+    if stats.counter is not None:
+        return stats.counter.by_count()
+    if stats.frequencies is None:
+        raise ValueError("these statistics have no frequency table")
+    # sorted() is stable, so equal counts stay in insertion order.
+    return iter(sorted(stats.frequencies.items(), key=itemgetter(1),
+                       reverse=True))
+
+
+def format_from_path(path: Path) -> str | None:
+    """Guess the export format from the file extension, if possible."""
+    suffix = path.suffix.lower().lstrip(".")
+    aliases = {"jsonl": "ndjson", "pq": "parquet"}
+    suffix = aliases.get(suffix, suffix)
+    return suffix if suffix in FORMATS else None
+
+
+def write_csv(rows: Iterable[Row], path: Path,
+              batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Write ``rows`` as CSV with a ``word,count`` header; return row count."""
+    written = 0
+    with path.open("w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(("word", "count"))
+        for batch in _batches(rows, batch_size):
+            writer.writerows(batch)
+            written += len(batch)
+    return written
+
+
+def write_ndjson(rows: Iterable[Row], path: Path,
+                 batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Write one ``{"word": ..., "count": ...}`` object per line."""
+    written = 0
+    dumps = json.JSONEncoder(ensure_ascii=False).encode
+    with path.open("w", encoding="utf-8", newline="\n") as f:
+        for batch in _batches(rows, batch_size):
+            f.writelines(dumps({"word": w, "count": c}) + "\n"
+                         for w, c in batch)
+            written += len(batch)
+    return written
+
+
+def write_parquet(rows: Iterable[Row], path: Path,
+                  batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Write a Parquet file with ``word`` (string) and ``count`` (int64).
+
+    Each batch becomes its own row group, so readers can load large
+    tables incrementally.
+
+    Raises:
+        ImportError: if ``pyarrow`` is not installed.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError(
+            "Parquet export needs pyarrow: pip install pyarrow") from e
+
+    schema = pa.schema([("word", pa.string()), ("count", pa.int64())])
+    written = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for batch in _batches(rows, batch_size):
+            words, counts = zip(*batch)
+            writer.write_table(pa.table(
+                [pa.array(words, pa.string()), pa.array(counts, pa.int64())],
+                schema=schema))
+            written += len(batch)
+    return written
+
+
+WRITERS = {"csv": write_csv, "ndjson": write_ndjson, "parquet": write_parquet}
+
+
+def export_frequencies(rows: Iterable[Row], path: Path, fmt: str,
+                       batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Write ``rows`` to ``path`` in format ``fmt``; return rows written."""
+    if fmt not in WRITERS:
+        raise ValueError(f"unknown export format: {fmt!r}")
+    return WRITERS[fmt](rows, path, batch_size)
@@ -0,0 +1,216 @@
+"""Exact word counting under a memory budget (spill to disk).
+
+``ExternalCounter`` keeps a normal in-memory table until its estimated
+size reaches ``max_memory`` bytes. It then writes the table, sorted by
+word, to a temporary "run" file and starts again with an empty table.
+At the end the runs are combined with a streaming k-way merge
+(``heapq.merge``), so only one line per run is held in memory.
+
+Every word also remembers when it was first seen, so ties for the most
+common word are broken exactly like ``max(freq, key=freq.get)`` in
+``text_utils``: results match the in-memory path, just more slowly.
+"""
+
+from __future__ import annotations
+
+import copy
+import heapq
+import math
+import os
+import sys
+import tempfile
+from itertools import groupby, islice
+from operator import itemgetter
+from pathlib import Path
+from typing import Iterator
+
+
+# Rough cost of one table entry beyond the word itself: two dict slots
+# plus the count and first-seen integers.
+_ENTRY_OVERHEAD = 200
+
+# Merge at most this many runs at once to stay clear of open-file limits.
+MAX_FAN_IN = 64
+
+# Entries sorted in memory at a time when re-sorting by count.
+SORT_BATCH = 500_000
+
+# (word, count, first_seen)
+Entry = tuple[str, int, int]
+
+
+def parse_size(text: str) -> int:
+    """Parse a byte size such as ``"512M"``, ``"2G"`` or ``"1048576"``.
+
+    Raises:
+        ValueError: if ``text`` is not a finite number of bytes.
+    """
+    units = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+    text = text.strip().upper().removesuffix("B")
+    factor = units.get(text[-1:], 1)
+    if factor != 1:
+        text = text[:-1]
+    size = float(text) * factor
+    if not math.isfinite(size):
+        raise ValueError(f"size must be finite: {text!r}")
+    return int(size)
+
+
+def _write_run(entries: Iterator[Entry], directory: Path) -> Path:
+    fd, name = tempfile.mkstemp(suffix=".run", dir=directory)
+    with os.fdopen(fd, "w", encoding="utf-8", newline="\n") as f:
+        # Words never contain whitespace, so tabs and newlines are safe.
+        f.writelines(f"{w}\t{c}\t{s}\n" for w, c, s in entries)
+    return Path(name)
+
+
+def _read_run(path: Path) -> Iterator[Entry]:
+    with path.open("r", encoding="utf-8", newline="\n") as f:
+        for line in f:
+            w, c, s = line.rstrip("\n").split("\t")
+            yield w, int(c), int(s)
+
+
+def _by_count_key(entry: Entry) -> tuple[int, int]:
+    # Most frequent first; ties in order of first appearance.
+    return -entry[1], entry[2]
+
+
+def _combine(entries: Iterator[Entry]) -> Iterator[Entry]:
+    """Sum counts of adjacent equal words in a word-sorted stream."""
+    for word, group in groupby(entries, key=itemgetter(0)):
+        count = 0
+        first = sys.maxsize
+        for _, c, s in group:
+            count += c
+            first = min(first, s)
+        yield word, count, first
+
+
+class ExternalCounter:
+    """Word -> count table that spills sorted runs to disk when full.
+
+    Use as a context manager (or call ``close()``) to remove the
+    temporary run files.
+    """
+
+    def __init__(self, max_memory: int, temp_dir: str | Path | None = None
+                 ) -> None:
+        if max_memory < 1:
+            raise ValueError("max_memory must be positive")
+        self.max_memory = max_memory
+        self._tmp = tempfile.TemporaryDirectory(prefix="wordcount-",
+                                                dir=temp_dir)
+        self.directory = Path(self._tmp.name)
+        self.runs: list[Path] = []
+
+        self._counts: dict[str, int] = {}
+        self._first: dict[str, int] = {}
+        self._memory = 0
+        self._serial = 0
+
+    def __enter__(self) -> ExternalCounter:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Delete all run files."""
+        self._tmp.cleanup()
+
+    def __deepcopy__(self, memo) -> ExternalCounter:
+        # A read-only snapshot (see ``TextStats.finished_copy``): it shares
+        # the run files and directory with ``self`` and never spills, so
+        # it can neither delete nor add runs behind the original's back.
+        self.runs = self._reduce_runs(self.runs)
+        clone = copy.copy(self)
+        clone.max_memory = math.inf
+        clone.runs = list(self.runs)
+        clone._counts = dict(self._counts)
+        clone._first = dict(self._first)
+        memo[id(self)] = clone
+        return clone
+
+    def add(self, counts: dict[str, int]) -> None:
+        """Add ``counts`` (word -> occurrences, in first-seen order)."""
+        table = self._counts
+        first = self._first
+        for word, count in counts.items():
+            c = table.get(word)
+            if c is not None:
+                table[word] = c + count
+                continue
+            table[word] = count
+            first[word] = self._serial
+            self._serial += 1
+            self._memory += _ENTRY_OVERHEAD + len(word)
+            if self._memory >= self.max_memory:
+                self.spill()
+                table = self._counts
+                first = self._first
+
+    def spill(self) -> None:
+        """Write the in-memory table to a new run file and clear it."""
+        if not self._counts:
+            return
+        first = self._first
+        entries = ((w, c, first[w]) for w, c in sorted(self._counts.items()))
+        self.runs.append(_write_run(entries, self.directory))
+        self._counts = {}
+        self._first = {}
+        self._memory = 0
+
+    def _reduce_runs(self, runs: list[Path], key=None,
+                     combine: bool = True) -> list[Path]:
+        # Merge runs in groups until one k-way merge can take them all.
+        while len(runs) > MAX_FAN_IN:
+            group, runs = runs[:MAX_FAN_IN], runs[MAX_FAN_IN:]
+            merged = heapq.merge(*map(_read_run, group), key=key)
+            if combine:
+                merged = _combine(merged)
+            runs.append(_write_run(merged, self.directory))
+            for path in group:
+                path.unlink()
+        return runs
+
+    def entries(self) -> Iterator[Entry]:
+        """Yield ``(word, count, first_seen)`` for each word, word-sorted."""
+        self.runs = self._reduce_runs(self.runs)
+        first = self._first
+        in_memory = ((w, c, first[w]) for w, c in sorted(self._counts.items()))
+        streams = [_read_run(path) for path in self.runs] + [in_memory]
+        return _combine(heapq.merge(*streams))
+
+    def items(self) -> Iterator[tuple[str, int]]:
+        """Yield ``(word, count)`` pairs, sorted by word."""
+        for word, count, _ in self.entries():
+            yield word, count
+
+    def most_common(self, k: int) -> list[tuple[str, int]]:
+        """Return the ``k`` most common words, ties by first appearance."""
+        top = heapq.nsmallest(k, self.entries(),
+                              key=lambda e: (-e[1], e[2]))
+        return [(word, count) for word, count, _ in top]
+
+    def by_count(self) -> Iterator[tuple[str, int]]:
+        """Yield ``(word, count)`` pairs, most frequent first.
+
+        Ties keep the order in which words first appeared, matching a
+        stable sort of the in-memory table. The table is re-sorted in
+        batches of ``SORT_BATCH`` entries and merged again, so memory
+        stays bounded even when it does not fit in RAM.
+        """
+        entries = self.entries()
+        runs = []
+        while batch := list(islice(entries, SORT_BATCH)):
+            batch.sort(key=_by_count_key)
+            runs.append(_write_run(iter(batch), self.directory))
+        runs = self._reduce_runs(runs, key=_by_count_key, combine=False)
+        try:
+            merged = heapq.merge(*map(_read_run, runs), key=_by_count_key)
+            for word, count, _ in merged:
+                yield word, count
+        finally:
+            for path in runs:
+                path.unlink(missing_ok=True)
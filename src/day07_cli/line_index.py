@@ -0,0 +1,217 @@
+"""Persistent newline-offset index for O(1) line counts and line seeking.
+
+``LineIndex.build()`` scans a file once and writes a sidecar file
+(``<name>.lidx``) holding the byte offset where every line starts. The
+sidecar records the file's size and modification time; ``LineIndex.open``
+rebuilds it when either no longer matches.
+
+The offsets are memory-mapped rather than loaded, so opening the index
+of a file with hundreds of millions of lines is instant, and:
+- the line count is read from the header
+- ``byte_range(a, b)`` finds where lines ``a..b`` live for a direct seek
+- ``shard_ranges(n)`` splits a file into line-aligned byte ranges for
+  parallel workers
+
+Lines end at ``"\\n"`` (so ``"\\r\\n"`` files work too), matching
+``count_lines`` for such files; other separators that ``splitlines()``
+honours (lone ``"\\r"``, ``"\\x1c"``, ...) are not treated as breaks.
+The index records whether the file contains any (``other_breaks``), in
+which case its line numbers differ from ``count_lines`` and callers
+should fall back to streaming.
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+from array import array
+from pathlib import Path
+from typing import BinaryIO, Iterator
+
+from streaming import DEFAULT_CHUNK_SIZE
+
+
+SUFFIX = ".lidx"
+_MAGIC = b"LIDX2\0\0\0"
+# magic, file size, file mtime_ns, line count, other line breaks seen
+_HEADER = struct.Struct("<8sQqQ?7x")
+
+# UTF-8 line separators that ``str.splitlines()`` honours besides "\n"
+# and "\r" (checked separately, since "\r\n" is fine).
+_OTHER_BREAKS = (b"\x0b", b"\x0c", b"\x1c", b"\x1d", b"\x1e", b"\xc2\x85",
+                 b"\xe2\x80\xa8", b"\xe2\x80\xa9")
+
+
+def sidecar_path(path: Path) -> Path:
+    """Where the index for ``path`` is stored."""
+    return path.with_name(path.name + SUFFIX)
+
+
+class LineIndex:
+    """Line-start offsets of one file, backed by its sidecar file.
+
+    Use as a context manager (or call ``close()``) to release the mapping.
+    """
+
+    def __init__(self, path: Path, index_path: Path) -> None:
+        self.path = path
+        self.index_path = index_path
+        with index_path.open("rb") as f:
+            header = f.read(_HEADER.size)
+            (magic, self.file_size, self.mtime_ns, self.line_count,
+             self.other_breaks) = _HEADER.unpack(header)
+            if magic != _MAGIC:
+                raise ValueError(f"{index_path} is not a line index")
+            # A truncated or padded body would misalign the offsets (or
+            # make the cast below fail), so check it before mapping.
+            expected = _HEADER.size + 8 * self.line_count
+            if os.fstat(f.fileno()).st_size != expected:
+                raise ValueError(f"{index_path} is truncated or corrupt")
+            self._map = None
+            self._body = None
+            self.offsets: memoryview | array = array("Q")
+            if self.line_count:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._body = memoryview(self._map)[_HEADER.size:]
+                self.offsets = self._body.cast("Q")
+
+    def __enter__(self) -> LineIndex:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._map is not None:
+            self.offsets.release()
+            self._body.release()
+            self._map.close()
+            self._map = None
+
+    @classmethod
+    def build(cls, path: Path, chunk_size: int = DEFAULT_CHUNK_SIZE
+              ) -> LineIndex:
+        """Scan ``path`` once and (re)write its sidecar index."""
+        index_path = sidecar_path(path)
+        tmp_path = index_path.with_name(index_path.name + ".tmp")
+        st = os.stat(path)
+
+        count = 0
+        other_breaks = False
+        tail = b""
+        with path.open("rb") as src, tmp_path.open("wb") as out:
+            # Placeholder header, rewritten once the count is known.
+            out.write(b"\0" * _HEADER.size)
+            for chunk, offsets in _iter_line_starts(src, chunk_size):
+                offsets.tofile(out)
+                count += len(offsets)
+                if not other_breaks:
+                    # Overlap the previous chunk so a "\r\n" pair or a
+                    # multi-byte separator split between chunks is seen.
+                    window = tail + chunk
+                    other_breaks = _has_other_breaks(window)
+                    tail = window[-2:]
+            out.seek(0)
+            out.write(_HEADER.pack(_MAGIC, st.st_size, st.st_mtime_ns,
+                                   count, other_breaks))
+        os.replace(tmp_path, index_path)
+        return cls(path, index_path)
+
+    @classmethod
+    def open(cls, path: Path, chunk_size: int = DEFAULT_CHUNK_SIZE
+             ) -> LineIndex:
+        """Open the sidecar index of ``path``, rebuilding it if stale."""
+        index = cls.open_current(path)
+        if index is None:
+            return cls.build(path, chunk_size)
+        return index
+
+    @classmethod
+    def open_current(cls, path: Path) -> LineIndex | None:
+        """Open the sidecar index of ``path`` if one exists and is current.
+
+        Returns None (and builds nothing) when it is missing or stale.
+        """
+        st = os.stat(path)
+        try:
+            index = cls(path, sidecar_path(path))
+        except (OSError, ValueError, struct.error):
+            return None
+        if (index.file_size, index.mtime_ns) != (st.st_size, st.st_mtime_ns):
+            index.close()
+            return None
+        return index
+
+    def line_offset(self, line: int) -> int:
+        """Byte offset where 0-based ``line`` starts (or the file size)."""
+        if line >= self.line_count:
+            return self.file_size
+        return self.offsets[line]
+
+    def byte_range(self, first: int, stop: int) -> tuple[int, int]:
+        """Byte range ``[start, end)`` of 0-based lines ``first:stop``."""
+        first = max(0, min(first, self.line_count))
+        stop = max(first, min(stop, self.line_count))
+        return self.line_offset(first), self.line_offset(stop)
+
+    def shard_ranges(self, shards: int) -> list[tuple[int, int]]:
+        """Split the file into up to ``shards`` line-aligned byte ranges."""
+        shards = max(1, min(shards, self.line_count))
+        bounds = [self.line_offset(self.line_count * i // shards)
+                  for i in range(shards)] + [self.file_size]
+        return [(a, b) for a, b in zip(bounds, bounds[1:]) if a < b]
+
+
+def _has_other_breaks(data: bytes) -> bool:
+    """True if ``data`` holds a line break other than "\\n" or "\\r\\n".
+
+    A trailing "\\r" is not counted: "\\n" may follow in the next chunk,
+    and at the end of the file it ends the last line either way.
+    """
+    if any(sep in data for sep in _OTHER_BREAKS):
+        return True
+    return b"\r" in data.removesuffix(b"\r").replace(b"\r\n", b"")
+
+
+def _iter_line_starts(f: BinaryIO, chunk_size: int
+                      ) -> Iterator[tuple[bytes, array]]:
+    """Yield each chunk read with the line-start offsets found in it."""
+    position = 0
+    at_line_start = True
+    while chunk := f.read(chunk_size):
+        offsets = array("Q")
+        if at_line_start:
+            offsets.append(position)
+        i = chunk.find(b"\n")
+        while i != -1:
+            if i + 1 < len(chunk):
+                offsets.append(position + i + 1)
+            i = chunk.find(b"\n", i + 1)
+        at_line_start = chunk.endswith(b"\n")
+        position += len(chunk)
+        yield chunk, offsets
+
+
+def iter_range(f: BinaryIO, start: int, end: int,
+               chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield the bytes ``[start, end)`` of ``f`` in chunks."""
+    f.seek(start)
+    remaining = end - start
+    while remaining > 0:
+        chunk = f.read(min(chunk_size, remaining))
+        if not chunk:
+            return
+        remaining -= len(chunk)
+        yield chunk
+
+
+def read_lines(path: Path, first: int, stop: int) -> list[str]:
+    """Return 0-based lines ``first:stop`` of ``path`` (without newlines)."""
+    with LineIndex.open(path) as index, path.open("rb") as f:
+        first = max(0, min(first, index.line_count))
+        stop = max(first, min(stop, index.line_count))
+        start, end = index.byte_range(first, stop)
+        data = b"".join(iter_range(f, start, end))
+    lines = data.decode("utf-8").split("\n")[:stop - first]
+    return [line.removesuffix("\r") for line in lines]
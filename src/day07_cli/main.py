@@ -1,67 +1,437 @@
 """
 Main script for text analysis.
-Prompts user for a file path and displays text statistics.
+Reads a text file (or standard input) and displays text statistics.
 """
 
 import argparse
+import sys
+import time
 from pathlib import Path
-from text_utils import read_text, count_lines, count_words, most_common_word
+from typing import BinaryIO
+from cardinality import UniqueCounter
+from cooccur import CooccurrenceMatrix, cooccurrence_file
+from export import (FORMATS, export_frequencies, format_from_path,
+                    frequency_rows)
+from external_count import ExternalCounter, parse_size
+from line_index import LineIndex, iter_range
+from ngrams import NgramCounter
+from normalize import ENGLISH_STOPWORDS, build_normalizer, load_stopwords
+from readahead import DEFAULT_DEPTH, ReadAhead
+from sampling import SampleReport, sample_file
+from streaming import (DEFAULT_CHUNK_SIZE, TextStats, analyze_chunks,
+                       analyze_stream)
+from watch import DEFAULT_INTERVAL, FileTail, watch
+
+
+# Passing "-" as the file (or no file at all) reads standard input.
+STDIN = Path("-")
 
 
 def parse_args() -> argparse.Namespace:
     """Parse command-line arguments for the script.
 
-    Provides flags: --file/-f, --lines, --words, --common. If no stat
-    flags are provided the script prints all statistics.
+    Provides flags: --file/-f, --lines, --words, --common, --unique and
+    --ngrams N (with --top/--min-count). If no stat flags are provided
+    the script prints lines, words and the most common word. --watch keeps
+    running and reprints the statistics as the file grows. --index and
+    --lines-range use a sidecar line index to skip straight to lines.
     """
     parser = argparse.ArgumentParser(
         description="Analyze text file and display statistics.")
     parser.add_argument("--file", "-f", dest="file_path", type=Path,
-                        required=True, help="Path to the text file to analyze.")
+                        default=STDIN,
+                        help="Path to the text file to analyze. Use '-' or "
+                             "omit to read from standard input.")
     parser.add_argument("--lines", action="store_true",
                         help="Print number of lines.")
     parser.add_argument("--words", action="store_true",
                         help="Print number of words.")
     parser.add_argument("--common", action="store_true",
                         help="Print most common word.")
+    parser.add_argument("--unique", action="store_true",
+                        help="Print number of distinct words (estimated "
+                             "for very large vocabularies).")
+    parser.add_argument("--ngrams", metavar="N", type=int,
+                        help="Print the most frequent N-word sequences.")
+    parser.add_argument("--top", metavar="K", type=int, default=10,
+                        help="Number of n-grams to print (default: 10).")
+    parser.add_argument("--min-count", type=int, default=1,
+                        help="Skip n-grams (and, for --cooccur, words) seen "
+                             "fewer times (default: 1).")
+    parser.add_argument("--cooccur", metavar="W", type=int,
+                        help="Print the word pairs most often found within "
+                             "W words of each other.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Processes used to count --cooccur on a file "
+                             "(default: %(default)s).")
+    parser.add_argument("--stopwords", metavar="FILE", nargs="?", type=Path,
+                        const=True,
+                        help="Drop stopwords: the built-in English list, or "
+                             "one word per line from FILE.")
+    parser.add_argument("--stem", action="store_true",
+                        help="Reduce words to a simple stem "
+                             "(e.g. 'running' -> 'run').")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="Bytes read per step (default: 1 MiB).")
+    parser.add_argument("--read-ahead", metavar="DEPTH", type=int,
+                        default=DEFAULT_DEPTH,
+                        help="Chunks to prefetch on a background thread "
+                             "while counting; 0 reads inline "
+                             "(default: %(default)s).")
+    parser.add_argument("--max-memory", metavar="SIZE", type=parse_size,
+                        help="Cap the word table at SIZE (e.g. 512M) and "
+                             "spill sorted runs to disk beyond it.")
+    parser.add_argument("--temp-dir", type=Path,
+                        help="Directory for --max-memory spill files "
+                             "(default: system temp directory).")
+    parser.add_argument("--export", metavar="PATH", type=Path,
+                        help="Write the full word frequency table to PATH, "
+                             "most frequent first.")
+    parser.add_argument("--format", choices=FORMATS,
+                        help="Format for --export (default: from the file "
+                             "extension, else csv). parquet needs pyarrow.")
+    parser.add_argument("--sample", metavar="FRACTION", type=float,
+                        help="Estimate lines, words and common words from a "
+                             "random FRACTION (0-1] of the file's blocks.")
+    parser.add_argument("--seed", type=int,
+                        help="Random seed for --sample (for repeatable runs).")
+    parser.add_argument("--index", action="store_true",
+                        help="Keep a line-offset index next to the file so "
+                             "--lines (alone) is answered without reading it.")
+    parser.add_argument("--lines-range", metavar="A:B", dest="line_range",
+                        type=parse_line_range,
+                        help="Only analyze lines A to B (1-based, "
+                             "inclusive; either end may be left out). "
+                             "Uses the line index.")
+    parser.add_argument("--watch", action="store_true",
+                        help="Keep following the file and reprint the "
+                             "statistics when it changes.")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL,
+                        help="Minimum seconds between --watch updates "
+                             "(default: %(default)s).")
+
+    args = parser.parse_args()
+    if args.ngrams is not None and args.ngrams < 1:
+        parser.error("--ngrams must be at least 1")
+    if args.cooccur is not None and args.cooccur < 1:
+        parser.error("--cooccur must be at least 1")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.workers > 1 and (args.file_path == STDIN or args.watch
+                             or args.line_range is not None):
+        parser.error("--workers needs a whole --file (no --watch or "
+                     "--lines-range)")
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")
+    if args.read_ahead < 0:
+        parser.error("--read-ahead must not be negative")
+    if args.max_memory is not None and args.max_memory < 1:
+        parser.error("--max-memory must be positive")
+    if args.export is not None and args.watch:
+        parser.error("--export can't be combined with --watch")
+    if args.export is not None and args.format is None:
+        args.format = format_from_path(args.export) or "csv"
+    if args.sample is not None:
+        if not 0 < args.sample <= 1:
+            parser.error("--sample must be in (0, 1]")
+        if args.file_path == STDIN:
+            parser.error("--sample needs a --file it can seek in")
+        if (args.unique or args.ngrams is not None
+                or args.cooccur is not None or args.watch
+                or args.export is not None or args.max_memory is not None):
+            parser.error("--sample supports only --lines, --words and "
+                         "--common")
+    if args.index or args.line_range is not None:
+        if args.file_path == STDIN:
+            parser.error("--index and --lines-range need a --file")
+        if args.watch or args.sample is not None:
+            parser.error("--index and --lines-range can't be combined with "
+                         "--watch or --sample")
+    if args.interval < 0:
+        parser.error("--interval must not be negative")
+    if args.watch and args.file_path == STDIN:
+        parser.error("--watch needs a --file to follow")
+    if args.file_path == STDIN and sys.stdin.isatty():
+        parser.error("no --file given and nothing piped to standard input")
+
+    if args.stopwords is True:
+        args.stopwords = ENGLISH_STOPWORDS
+    elif args.stopwords is not None:
+        try:
+            args.stopwords = load_stopwords(args.stopwords)
+        except OSError as e:
+            parser.error(f"could not read stopwords file: {e}")
+
+    # If no specific stat flags provided, print all
+    if not (args.lines or args.words or args.common or args.unique
+            or args.ngrams is not None or args.cooccur is not None):
+        args.lines = args.words = args.common = True
+    return args
+
+
+def parse_line_range(text: str) -> tuple[int, int]:
+    """Parse ``"A:B"`` (1-based, inclusive) into 0-based ``(first, stop)``.
+
+    ``"A:"`` runs to the end of the file and ``":B"`` starts at line 1.
+    """
+    start, sep, end = text.partition(":")
+    try:
+        first = int(start) if start.strip() else 1
+        last = int(end) if end.strip() else sys.maxsize
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"invalid line range {text!r} (expected A:B)") from None
+    if not sep or first < 1 or last < first:
+        raise argparse.ArgumentTypeError(
+            f"invalid line range {text!r} (expected A:B with 1 <= A <= B)")
+    return first - 1, last
+
+
+def make_normalizer(args: argparse.Namespace):
+    """Return the --stopwords/--stem normalizer, or None for the default."""
+    if args.stopwords is None and not args.stem:
+        return None
+    return build_normalizer(args.stopwords, args.stem)
+
+
+def build_stats(args: argparse.Namespace) -> TextStats:
+    """Create the running counters needed for the requested statistics."""
+    normalizer = make_normalizer(args)
+
+    sinks = []
+    if args.unique:
+        sinks.append(UniqueCounter())
+    if args.ngrams is not None:
+        sinks.append(NgramCounter(args.ngrams, min_count=args.min_count))
+    if args.cooccur is not None and args.workers == 1:
+        sinks.append(CooccurrenceMatrix(args.cooccur))
+    need_table = args.common or args.export is not None
+    counter = None
+    if need_table and args.max_memory is not None:
+        counter = ExternalCounter(args.max_memory, args.temp_dir)
+    return TextStats(frequencies=need_table, sinks=sinks, counter=counter,
+                     normalizer=normalizer)
+
+
+def print_stats(args: argparse.Namespace, stats: TextStats) -> None:
+    """Print the requested statistics from ``stats``."""
+    if args.lines:
+        print(f"Lines: {stats.line_count}")
+    if args.words:
+        print(f"Words: {stats.word_count}")
+    if args.common:
+        common = stats.most_common_word()
+        print(f"Most common word: {common if common else '(none)'}")
+    for sink in stats.sinks:
+        if isinstance(sink, UniqueCounter):
+            unique = sink.count() if sink.is_exact else f"~{sink.count()}"
+            print(f"Unique words: {unique}")
+        elif isinstance(sink, NgramCounter):
+            print(f"Top {sink.n}-grams:")
+            for gram, count in sink.most_common(args.top):
+                print(f"  {' '.join(gram)}: {count}")
+        elif isinstance(sink, CooccurrenceMatrix):
+            print_cooccurrence(args, sink)
+
+
+def print_cooccurrence(args: argparse.Namespace,
+                       matrix: CooccurrenceMatrix) -> None:
+    """Print the most frequent word pairs of a co-occurrence matrix."""
+    print(f"Top pairs within {matrix.window} words:")
+    for (a, b), count in matrix.most_common(args.top, args.min_count):
+        print(f"  {a} {b}: {count}")
+
+
+def watch_file(args: argparse.Namespace) -> None:
+    """Follow ``args.file_path`` and reprint statistics until Ctrl-C."""
+    def report(tail: FileTail) -> None:
+        print(f"[{time.strftime('%H:%M:%S')}] {tail.path}")
+        # Include a last word/line that is still waiting for its end.
+        print_stats(args, tail.stats.finished_copy())
+        sys.stdout.flush()
+
+    tail = FileTail(args.file_path, lambda: build_stats(args),
+                    args.chunk_size)
+    try:
+        watch([tail], report, args.interval)
+    except KeyboardInterrupt:
+        pass
+    except PermissionError:
+        print(f"Error: Permission denied when trying to read "
+              f"'{args.file_path}'.")
+    except UnicodeDecodeError:
+        print(f"Error: '{args.file_path}' is not valid UTF-8 text.")
+    except OSError as e:
+        print(f"Error: Could not read '{args.file_path}': {e}")
+
 
-    return parser.parse_args()
+def print_sample(args: argparse.Namespace, report: SampleReport) -> None:
+    """Print --sample estimates with their 95% confidence intervals."""
+    share = report.blocks_sampled / report.blocks_total
+    print(f"Sampled {report.blocks_sampled} of {report.blocks_total} blocks "
+          f"({share:.1%} of {report.file_size} bytes); "
+          f"ranges are 95% confidence intervals.")
+    if args.lines:
+        e = report.lines
+        print(f"Lines: ~{e.value:.0f} ({e.low:.0f}-{e.high:.0f})")
+    if args.words:
+        e = report.words
+        print(f"Words: ~{e.value:.0f} ({e.low:.0f}-{e.high:.0f})")
+    if args.common:
+        print("Likely most common words:")
+        for word, count in report.top_words:
+            print(f"  {word}: ~{count:.0f}")
+        if not report.top_words:
+            print("  (none)")
+
+
+def export_table(args: argparse.Namespace, stats: TextStats) -> None:
+    """Write the frequency table to ``args.export``."""
+    try:
+        rows = export_frequencies(frequency_rows(stats), args.export,
+                                  args.format)
+    except ImportError as e:
+        print(f"Error: {e}")
+    except OSError as e:
+        print(f"Error: Could not write '{args.export}': {e}")
+    else:
+        print(f"Exported {rows} words to '{args.export}' ({args.format}).")
+
+
+def stream_into(stream: BinaryIO, stats: TextStats,
+                args: argparse.Namespace) -> None:
+    """Analyze ``stream``, prefetching chunks if --read-ahead is set."""
+    if not args.read_ahead:
+        analyze_stream(stream, stats, args.chunk_size)
+        return
+    with ReadAhead(stream, args.chunk_size, args.read_ahead) as chunks:
+        analyze_chunks(chunks, stats)
+
+
+def read_input(args: argparse.Namespace, source: str, stats: TextStats,
+               byte_range: tuple[int, int] | None = None) -> bool:
+    """Stream the input (or just ``byte_range`` of it) into ``stats``.
+
+    Returns False after an error.
+    """
+    try:
+        if args.file_path == STDIN:
+            stream_into(sys.stdin.buffer, stats, args)
+        elif byte_range is not None:
+            with args.file_path.open("rb") as f:
+                analyze_chunks(iter_range(f, *byte_range, args.chunk_size),
+                               stats)
+        else:
+            with args.file_path.open("rb") as f:
+                stream_into(f, stats, args)
+    except KeyboardInterrupt:
+        # Report whatever was counted before Ctrl-C.
+        print("Interrupted: showing partial results.", file=sys.stderr)
+    except PermissionError:
+        print(f"Error: Permission denied when trying to read {source}.")
+        return False
+    except UnicodeDecodeError:
+        print(f"Error: {source} is not valid UTF-8 text.")
+        return False
+    except OSError as e:
+        print(f"Error: Could not read {source}: {e}")
+        return False
+    return True
+
+
+def count_shards(args: argparse.Namespace, source: str) -> bool:
+    """Count --cooccur over --workers processes and print the pairs.
+
+    Returns False after an error.
+    """
+    try:
+        matrix = cooccurrence_file(args.file_path, args.cooccur,
+                                   args.workers, make_normalizer(args),
+                                   args.chunk_size)
+    except UnicodeDecodeError:
+        print(f"Error: {source} is not valid UTF-8 text.")
+        return False
+    except OSError as e:
+        print(f"Error: Could not read {source}: {e}")
+        return False
+    print_cooccurrence(args, matrix)
+    return True
 
 
 def main() -> None:
     """Entry point: parse args and print text metrics."""
     args = parse_args()
     file_path = args.file_path
-    # If no specific stat flags provided, print all
-    want_lines = args.lines
-    want_words = args.words
-    want_common = args.common
-    if not (want_lines or want_words or want_common):
-        want_lines = want_words = want_common = True
 
-    if not file_path.exists():
+    if file_path == STDIN:
+        source = "standard input"
+    elif not file_path.exists():
         print(f"Error: The path '{file_path}' does not exist.")
         return
-    if not file_path.is_file():
+    elif not (file_path.is_file() or file_path.is_fifo()):
         print(f"Error: The path '{file_path}' is not a file.")
         return
+    else:
+        source = f"'{file_path}'"
 
-    try:
-        text = read_text(file_path)
-    except PermissionError:
-        print(f"Error: Permission denied when trying to read '{file_path}'.")
+    if args.watch:
+        watch_file(args)
         return
-    except OSError as e:
-        print(f"Error: Could not read '{file_path}': {e}")
+
+    if args.sample is not None:
+        try:
+            report = sample_file(file_path, args.sample, top=args.top,
+                                 seed=args.seed,
+                                 normalizer=make_normalizer(args))
+        except OSError as e:
+            print(f"Error: Could not read {source}: {e}")
+            return
+        print_sample(args, report)
         return
 
-    if want_lines:
-        print(f"Lines: {count_lines(text)}")
-    if want_words:
-        print(f"Words: {count_words(text)}")
-    if want_common:
-        common = most_common_word(text)
-        print(f"Most common word: {common if common else '(none)'}")
+    byte_range = None
+    if args.index or args.line_range is not None:
+        if not file_path.is_file():
+            print(f"Error: Can't index {source}: not a regular file.")
+            return
+        try:
+            with LineIndex.open(file_path, args.chunk_size) as index:
+                # With other line breaks the index's lines are not the
+                # ones --lines counts: stream instead, or refuse a range.
+                if args.line_range is not None:
+                    if index.other_breaks:
+                        print(f"Error: Can't use --lines-range on {source}: "
+                              "it has line breaks other than \"\\n\".")
+                        return
+                    byte_range = index.byte_range(*args.line_range)
+                elif not (index.other_breaks or args.words or args.common
+                          or args.unique or args.ngrams is not None
+                          or args.cooccur is not None
+                          or args.export is not None):
+                    print(f"Lines: {index.line_count}")
+                    return
+        except OSError as e:
+            print(f"Error: Could not index {source}: {e}")
+            return
+
+    # With several workers --cooccur reads the file in its own shards;
+    # the single-threaded pass is only needed for the other statistics.
+    sharded = args.cooccur is not None and args.workers > 1
+    needs_pass = not sharded or (args.lines or args.words or args.common
+                                 or args.unique or args.ngrams is not None
+                                 or args.export is not None)
+    stats = build_stats(args)
+    try:
+        if needs_pass and not read_input(args, source, stats, byte_range):
+            return
+        print_stats(args, stats)
+        if sharded and not count_shards(args, source):
+            return
+        if args.export is not None:
+            export_table(args, stats)
+    finally:
+        if stats.counter is not None:
+            stats.counter.close()
 
 
 if __name__ == "__main__":
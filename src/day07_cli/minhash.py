@@ -0,0 +1,275 @@
+"""MinHash signatures and LSH banding for near-duplicate documents.
+
+A document is reduced to a set of shingles: runs of ``k`` consecutive
+normalized words (the same words ``text_utils.iter_words`` yields) or,
+with ``kmers=True``, runs of ``k`` characters of the normalized text.
+Each shingle is hashed once with CRC-32, then ``num_perm`` hash
+functions ``h(x) = ((a * x + b) mod 2**64) mod p`` are applied and the
+minimum of each is kept. The share of equal positions in two signatures
+estimates the Jaccard similarity of the shingle sets.
+
+With NumPy installed all permutations are applied to blocks of shingles
+in one vectorized step; without it a pure-Python loop computes the
+identical signature.
+
+``LshIndex`` splits signatures into ``bands`` of ``rows`` values and
+buckets documents by each band, so only documents sharing a bucket are
+compared: finding candidate pairs is linear in the number of documents
+instead of quadratic.
+
+``file_signature`` keeps each file's signature in a ``<name>.minhash``
+sidecar, reused while the file's size and mtime (and the MinHash
+settings) are unchanged.
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import struct
+import zlib
+from array import array
+from itertools import combinations
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, NamedTuple
+
+from text_utils import iter_words
+
+try:
+    import numpy as np
+except ImportError:  # optional: pure-Python fallback below
+    np = None
+
+
+DEFAULT_NUM_PERM = 128
+DEFAULT_SHINGLE = 3
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_SEED = 1
+
+SUFFIX = ".minhash"
+
+_PRIME = (1 << 61) - 1
+_MASK64 = (1 << 64) - 1
+_MAX_HASH = (1 << 32) - 1
+
+_MAGIC = b"MHSH1\0\0\0"
+# magic, file size, file mtime_ns, num_perm, shingle size, kmers, seed
+_HEADER = struct.Struct("<8sQqIIBxxxq")
+
+# Shingles hashed per NumPy step, bounding the temporary to
+# num_perm * _BLOCK * 8 bytes.
+_BLOCK = 8192
+
+
+class MinHasher:
+    """Compute MinHash signatures with fixed, seeded permutations."""
+
+    def __init__(self, num_perm: int = DEFAULT_NUM_PERM,
+                 shingle: int = DEFAULT_SHINGLE, kmers: bool = False,
+                 seed: int = DEFAULT_SEED) -> None:
+        if num_perm < 1 or shingle < 1:
+            raise ValueError("num_perm and shingle must be at least 1")
+        self.num_perm = num_perm
+        self.shingle = shingle
+        self.kmers = kmers
+        self.seed = seed
+        rng = random.Random(seed)
+        self._a = [rng.randrange(1, _PRIME) for _ in range(num_perm)]
+        self._b = [rng.randrange(0, _PRIME) for _ in range(num_perm)]
+        if np is not None:
+            self._np_a = np.array(self._a, dtype=np.uint64)[:, None]
+            self._np_b = np.array(self._b, dtype=np.uint64)[:, None]
+
+    def shingles(self, text: str,
+                 normalizer: Callable[[str], str] | None = None
+                 ) -> set[str]:
+        """Return the set of shingles of ``text``."""
+        words = list(iter_words(text, normalizer))
+        k = self.shingle
+        if self.kmers:
+            joined = " ".join(words)
+            grams = (joined[i:i + k] for i in range(len(joined) - k + 1))
+        else:
+            grams = (" ".join(words[i:i + k])
+                     for i in range(len(words) - k + 1))
+        found = set(grams)
+        if not found and words:
+            found.add(" ".join(words))  # shorter than one shingle
+        return found
+
+    def signature(self, shingles: Iterable[str]) -> array:
+        """Return the MinHash signature (``array('I')``) of a shingle set.
+
+        An empty set gives all ``0xFFFFFFFF``.
+        """
+        hashes = [zlib.crc32(s.encode("utf-8")) for s in shingles]
+        if not hashes:
+            return array("I", [_MAX_HASH]) * self.num_perm
+        if np is not None:
+            x = np.array(hashes, dtype=np.uint64)
+            mins = np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+            for start in range(0, len(x), _BLOCK):
+                block = x[None, start:start + _BLOCK]
+                # uint64 arithmetic wraps, i.e. is taken mod 2**64.
+                h = (self._np_a * block + self._np_b) % np.uint64(_PRIME)
+                h &= np.uint64(_MAX_HASH)
+                np.minimum(mins, h.min(axis=1), out=mins)
+            return array("I", mins.astype(np.uint32).tobytes())
+        return array("I", (
+            min(((a * x + b) & _MASK64) % _PRIME & _MAX_HASH
+                for x in hashes)
+            for a, b in zip(self._a, self._b)))
+
+    def text_signature(self, text: str,
+                       normalizer: Callable[[str], str] | None = None
+                       ) -> array:
+        return self.signature(self.shingles(text, normalizer))
+
+
+def similarity(sig_a: array, sig_b: array) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    if len(sig_a) != len(sig_b):
+        raise ValueError("signatures have different lengths")
+    if not sig_a:
+        return 0.0
+    return sum(a == b for a, b in zip(sig_a, sig_b)) / len(sig_a)
+
+
+def choose_bands(num_perm: int, threshold: float) -> tuple[int, int]:
+    """Pick ``(bands, rows)`` with ``bands * rows <= num_perm``.
+
+    Pairs with similarity ``s`` become candidates with probability
+    ``1 - (1 - s**rows)**bands``; the S-curve's midpoint is roughly
+    ``(1 / bands) ** (1 / rows)``. This takes the largest ``rows`` whose
+    midpoint is still below ``threshold``, favouring recall: the exact
+    check on the signatures removes false candidates afterwards.
+    """
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        if (1 / bands) ** (1 / rows) <= threshold:
+            best = (bands, rows)
+    return best
+
+
+class LshIndex:
+    """Bucket signatures by band to find candidate near-duplicates."""
+
+    def __init__(self, bands: int, rows: int) -> None:
+        self.bands = bands
+        self.rows = rows
+        self._buckets: list[dict[bytes, list[int]]] = [
+            {} for _ in range(bands)]
+        self.keys: list = []
+        self.signatures: list[array] = []
+
+    def add(self, key, sig: array) -> None:
+        if len(sig) < self.bands * self.rows:
+            raise ValueError("signature is shorter than bands * rows")
+        index = len(self.keys)
+        self.keys.append(key)
+        self.signatures.append(sig)
+        raw = sig.tobytes()
+        width = self.rows * sig.itemsize
+        for band, buckets in enumerate(self._buckets):
+            part = raw[band * width:(band + 1) * width]
+            buckets.setdefault(part, []).append(index)
+
+    def candidates(self) -> set[tuple[int, int]]:
+        """Index pairs ``(i, j)``, ``i < j``, sharing at least one bucket."""
+        pairs = set()
+        for buckets in self._buckets:
+            for members in buckets.values():
+                if len(members) > 1:
+                    pairs.update(combinations(members, 2))
+        return pairs
+
+    def duplicates(self, threshold: float) -> Iterator[tuple]:
+        """Yield ``(key_a, key_b, similarity)`` at or above ``threshold``,
+        most similar first."""
+        sigs = self.signatures
+        found = []
+        for i, j in self.candidates():
+            s = similarity(sigs[i], sigs[j])
+            if s >= threshold:
+                found.append((s, i, j))
+        found.sort(key=lambda t: (-t[0], t[1], t[2]))
+        for s, i, j in found:
+            yield self.keys[i], self.keys[j], s
+
+
+def sidecar_path(path: Path) -> Path:
+    """Where the cached signature of ``path`` is stored."""
+    return path.with_name(path.name + SUFFIX)
+
+
+def _settings(hasher: MinHasher) -> tuple:
+    return hasher.num_perm, hasher.shingle, int(hasher.kmers), hasher.seed
+
+
+def file_signature(path: Path, hasher: MinHasher,
+                   normalizer: Callable[[str], str] | None = None,
+                   cache: bool = True) -> array:
+    """Return the signature of the text file ``path``, cached on disk.
+
+    The sidecar is ignored and rewritten when the file or the hasher's
+    settings changed. A custom ``normalizer`` is not part of the cache
+    key, so pass ``cache=False`` when switching normalizers.
+
+    Raises:
+        OSError, UnicodeDecodeError: if the file can't be read.
+    """
+    st = os.stat(path)
+    index_path = sidecar_path(path)
+    expected = (_MAGIC, st.st_size, st.st_mtime_ns) + _settings(hasher)
+    if cache:
+        try:
+            data = index_path.read_bytes()
+            sig = array("I")
+            sig.frombytes(data[_HEADER.size:])
+            if (_HEADER.unpack_from(data) == expected
+                    and len(sig) == hasher.num_perm):
+                return sig
+        except (OSError, ValueError, struct.error):
+            pass
+
+    sig = hasher.text_signature(path.read_text(encoding="utf-8"),
+                                normalizer)
+    if cache:
+        tmp_path = index_path.with_name(index_path.name + ".tmp")
+        try:
+            with tmp_path.open("wb") as out:
+                out.write(_HEADER.pack(*expected))
+                sig.tofile(out)
+            os.replace(tmp_path, index_path)
+        except OSError:
+            pass  # a read-only directory just means no cache
+    return sig
+
+
+class Duplicate(NamedTuple):
+    first: Path
+    second: Path
+    similarity: float
+
+
+def find_duplicates(paths: Iterable[Path],
+                    threshold: float = DEFAULT_THRESHOLD,
+                    hasher: MinHasher | None = None,
+                    normalizer: Callable[[str], str] | None = None,
+                    cache: bool = True,
+                    skipped: list[Path] | None = None) -> list[Duplicate]:
+    """Return pairs of files whose estimated similarity is >= ``threshold``.
+
+    Files that can't be read or decoded are skipped, and appended to
+    ``skipped`` when a list is given.
+    """
+    hasher = hasher or MinHasher()
+    index = LshIndex(*choose_bands(hasher.num_perm, threshold))
+    for path in paths:
+        try:
+            index.add(path, file_signature(path, hasher, normalizer, cache))
+        except (OSError, UnicodeDecodeError):
+            if skipped is not None:
+                skipped.append(path)
+    return [Duplicate(*d) for d in index.duplicates(threshold)]
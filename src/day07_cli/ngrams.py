@@ -0,0 +1,125 @@
+"""Streaming n-gram counting over a sequence of normalized words.
+
+Each distinct word is interned once to a small integer ID, and the last
+``n`` IDs are packed into a single integer with a rolling shift-and-mask.
+That integer is the dictionary key, so counting an n-gram never builds a
+tuple or joins strings; words are only looked up again when results are
+reported.
+
+Memory is bounded by ``max_entries``: when the table grows past it, the
+least frequent n-grams are pruned (lossy counting). Counts reported
+after a prune may be low by at most ``error_bound``.
+"""
+
+from __future__ import annotations
+
+import heapq
+from operator import itemgetter
+from typing import Iterable
+
+
+# Bits reserved per word ID inside a packed key (up to ~4 billion words).
+ID_BITS = 32
+
+DEFAULT_MAX_ENTRIES = 1_000_000
+
+
+class NgramCounter:
+    """Count n-grams from words fed in one or more ``update()`` calls.
+
+    The window carries over between calls, so feeding a stream in chunks
+    gives the same counts as feeding it all at once. Call
+    ``break_sequence()`` between documents that should not be joined.
+    """
+
+    def __init__(self, n: int = 2, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 min_count: int = 1) -> None:
+        if n < 1:
+            raise ValueError("n must be at least 1")
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.n = n
+        self.max_entries = max_entries
+        self.min_count = min_count
+        self.error_bound = 0
+
+        self.ids: dict[str, int] = {}
+        self.words: list[str] = []
+        self.counts: dict[int, int] = {}
+
+        self._mask = (1 << (ID_BITS * n)) - 1
+        self._key = 0
+        self._filled = 0
+
+    def break_sequence(self) -> None:
+        """Start a fresh window so no n-gram spans the break."""
+        self._key = 0
+        self._filled = 0
+
+    def update(self, words: Iterable[str]) -> None:
+        """Slide the window over ``words`` and count every full n-gram."""
+        # Local names keep attribute lookups out of the hot loop.
+        ids = self.ids
+        vocab = self.words
+        counts = self.counts
+        get = counts.get
+        mask = self._mask
+        key = self._key
+        filled = self._filled
+        need = self.n - 1
+        limit = self.max_entries
+
+        for word in words:
+            i = ids.get(word)
+            if i is None:
+                i = ids[word] = len(vocab)
+                vocab.append(word)
+            key = ((key << ID_BITS) | i) & mask
+
+            if filled < need:
+                filled += 1
+                continue
+
+            c = get(key)
+            if c is not None:
+                counts[key] = c + 1
+                continue
+            counts[key] = 1
+            if len(counts) > limit:
+                self._prune()
+                counts = self.counts
+                get = counts.get
+
+        self._key = key
+        self._filled = filled
+
+    def _prune(self) -> None:
+        # Keep the most frequent half; everything dropped had a count no
+        # larger than the new threshold, which bounds the undercount.
+        keep = max(self.max_entries // 2, 1)
+        kept = heapq.nlargest(keep, self.counts.items(), key=itemgetter(1))
+        self.error_bound += kept[-1][1]
+        self.counts = dict(kept)
+
+    def decode(self, key: int) -> tuple[str, ...]:
+        """Turn a packed key back into its tuple of words."""
+        id_mask = (1 << ID_BITS) - 1
+        return tuple(
+            self.words[(key >> (ID_BITS * shift)) & id_mask]
+            for shift in range(self.n - 1, -1, -1)
+        )
+
+    def most_common(
+        self, k: int | None = None
+    ) -> list[tuple[tuple[str, ...], int]]:
+        """Return the ``k`` most frequent n-grams at or above ``min_count``.
+
+        With ``k=None`` every n-gram passing ``min_count`` is returned,
+        most frequent first.
+        """
+        items = (kv for kv in self.counts.items() if kv[1] >= self.min_count)
+        if k is None:
+            top = sorted(items, key=itemgetter(1), reverse=True)
+        else:
+            top = heapq.nlargest(k, items, key=itemgetter(1))
+        return [(self.decode(key), count) for key, count in top]
@@ -0,0 +1,190 @@
+"""Configurable word normalization with a memo of recent tokens.
+
+A ``Normalizer`` runs each raw token through a chain of steps (strip
+punctuation, lowercase, drop stopwords, stem, ...). Any step may return
+an empty string to drop the token. Because natural text repeats the same
+raw tokens constantly, results are memoized in a bounded LRU cache:
+every distinct token pays for the chain once, later occurrences are a
+single cache lookup. That makes even a stemming pipeline cheaper than
+normalizing every occurrence from scratch.
+
+The default chain (strip punctuation, then lowercase) gives exactly the
+same words as ``text_utils.normalize_word``.
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+from pathlib import Path
+from string import punctuation
+from typing import Callable, Iterable
+
+
+Step = Callable[[str], str]
+
+DEFAULT_CACHE_SIZE = 1 << 16
+
+# A short list of very common English function words.
+ENGLISH_STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because
+been before being below between both but by can could did do does doing
+down during each few for from further had has have having he her here hers
+herself him himself his how i if in into is it its itself just me more
+most my myself no nor not now of off on once only or other our ours
+ourselves out over own same she should so some such than that the their
+theirs them themselves then there these they this those through to too
+under until up very was we were what when where which while who whom why
+will with would you your yours yourself yourselves
+""".split())
+
+
+def strip_punctuation(token: str) -> str:
+    """Remove ASCII punctuation from both ends of ``token``."""
+    return token.strip(punctuation)
+
+
+def lowercase(token: str) -> str:
+    """Lowercase ``token``."""
+    return token.lower()
+
+
+class RemoveStopwords:
+    """Step that drops tokens found in ``stopwords``."""
+
+    def __init__(self, stopwords: Iterable[str] = ENGLISH_STOPWORDS) -> None:
+        self.stopwords = frozenset(stopwords)
+
+    def __call__(self, token: str) -> str:
+        return "" if token in self.stopwords else token
+
+
+# (suffix, replacement), longest first. A light suffix stripper in the
+# spirit of Porter's step 1, not the full algorithm.
+#
+# Plural "-es" endings (step 1a). "es" is only a suffix after s/x/z/ch/sh
+# ("boxes"); elsewhere just the "s" goes ("notes" -> "note").
+_PLURAL_SUFFIXES = (
+    ("sses", "ss"), ("ches", "ch"), ("shes", "sh"), ("ies", "y"),
+    ("xes", "x"), ("zes", "z"),
+)
+_SUFFIXES = (
+    ("ational", "ate"), ("ization", "ize"), ("fulness", "ful"),
+    ("iveness", "ive"), ("ousness", "ous"), ("ied", "y"), ("ingly", ""),
+    ("edly", ""), ("eed", "ee"), ("ing", ""), ("ed", ""), ("s", ""),
+)
+# Endings that look like a plural but aren't one ("this", "bus", "class").
+_KEEP_ENDINGS = ("ss", "us", "is")
+# Words whose singular and plural are the same form.
+_INVARIANT = frozenset({"series", "species"})
+_VOWELS = frozenset("aeiouy")
+
+
+def _fix_ing_base(base: str) -> str:
+    """Tidy a stem left by "-ing"/"-ed", as Porter's step 1b does.
+
+    "-at", "-bl", "-iz" and short consonant-vowel-consonant stems get
+    their "e" back ("related" -> "relate", "making" -> "make"); other
+    doubled final consonants are undoubled ("running" -> "run").
+    """
+    if base.endswith(("at", "bl", "iz")):
+        return base + "e"
+    last = base[-1]
+    if last in _VOWELS:
+        return base
+    if base[-2] == last:
+        return base if last in "lsz" else base[:-1]
+    # One vowel group followed by a single consonant (not w/x/y).
+    vowel_groups = sum(1 for prev, ch in zip(" " + base, base)
+                       if ch in _VOWELS and prev not in _VOWELS)
+    if (vowel_groups == 1 and base[-2] in _VOWELS
+            and base[-3] not in _VOWELS and last not in "wxy"):
+        return base + "e"
+    return base
+
+
+def stem(token: str) -> str:
+    """Strip one common English suffix from ``token``.
+
+    The remaining stem must keep at least three letters including a
+    vowel, so short words ("is", "bed", "sing") are left alone. Words
+    ending in "ss", "us" or "is" keep their final "s" ("class", "bus",
+    "analysis"), as do "series" and "species". Plurals of words ending in
+    "e" keep it ("genes" -> "gene"), and so do their "-ing"/"-ed" forms
+    ("making" -> "make").
+    """
+    if (len(token) <= 3 or token.endswith(_KEEP_ENDINGS)
+            or token in _INVARIANT):
+        return token
+    for suffix, replacement in _PLURAL_SUFFIXES:
+        if token.endswith(suffix):
+            # Short singulars are fine here ("boxes" -> "box").
+            word = token[:-len(suffix)] + replacement
+            if len(word) < 3 or _VOWELS.isdisjoint(word):
+                return token
+            return word
+    for suffix, replacement in _SUFFIXES:
+        if token.endswith(suffix):
+            base = token[:-len(suffix)]
+            if len(base) < 3 or _VOWELS.isdisjoint(base):
+                return token
+            if not replacement and suffix[0] in "ie":
+                base = _fix_ing_base(base)
+            return base + replacement
+    return token
+
+
+DEFAULT_STEPS: tuple[Step, ...] = (strip_punctuation, lowercase)
+
+
+class Normalizer:
+    """Apply ``steps`` in order to raw tokens, memoizing the results.
+
+    Instances are callable: ``normalizer(token) -> word`` (empty string
+    when the token should be dropped).
+    """
+
+    def __init__(self, steps: Iterable[Step] = DEFAULT_STEPS,
+                 cache_size: int | None = DEFAULT_CACHE_SIZE) -> None:
+        self.steps = tuple(steps)
+        self.cache_size = cache_size
+        self._cached = lru_cache(maxsize=cache_size)(self._apply)
+
+    def __reduce__(self):
+        # Pickle the chain, not the memo (e.g. for worker processes).
+        return type(self), (self.steps, self.cache_size)
+
+    def _apply(self, token: str) -> str:
+        for step in self.steps:
+            token = step(token)
+            if not token:
+                return ""
+        return token
+
+    def __call__(self, token: str) -> str:
+        return self._cached(token)
+
+    def cache_info(self):
+        """Return hit/miss statistics of the memo (see ``lru_cache``)."""
+        return self._cached.cache_info()
+
+
+def load_stopwords(path: Path) -> frozenset[str]:
+    """Read one stopword per line (blank lines and ``#`` comments skipped)."""
+    with path.open("r", encoding="utf-8") as f:
+        return frozenset(
+            line.strip().lower() for line in f
+            if line.strip() and not line.lstrip().startswith("#")
+        )
+
+
+def build_normalizer(stopwords: Iterable[str] | None = None,
+                     stemming: bool = False,
+                     cache_size: int | None = DEFAULT_CACHE_SIZE
+                     ) -> Normalizer:
+    """Build the usual chain: punctuation, lowercase, stopwords, stem."""
+    steps: list[Step] = list(DEFAULT_STEPS)
+    if stopwords is not None:
+        steps.append(RemoveStopwords(stopwords))
+    if stemming:
+        steps.append(stem)
+    return Normalizer(steps, cache_size)
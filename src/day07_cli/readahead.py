@@ -0,0 +1,102 @@
+"""Overlap disk (or network/pipe) reads with tokenization.
+
+``ReadAhead`` starts a background thread that fills a small pool of
+reusable ``bytearray`` buffers with ``readinto()`` while the main thread
+processes the previous ones. Blocking reads release the GIL, so on slow
+storage the next chunk is usually already waiting when the tokenizer
+asks for it.
+
+At most ``depth`` filled buffers wait in the queue; together with the
+one being processed that bounds memory at ``(depth + 1) * chunk_size``.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+from typing import BinaryIO, Iterator
+
+from streaming import DEFAULT_CHUNK_SIZE
+
+
+DEFAULT_DEPTH = 2
+
+# Placed on the queue by the reader thread when the stream is exhausted.
+_EOF = object()
+
+
+class ReadAhead:
+    """Iterate over ``stream`` in chunks prefetched by a reader thread.
+
+    Each yielded ``memoryview`` is only valid until the next iteration
+    step: its buffer is then handed back to the reader for reuse. Copy it
+    (``bytes(view)``) if it must outlive that.
+
+    Use as a context manager, or call ``close()``, so the reader thread is
+    stopped if iteration ends early.
+    """
+
+    def __init__(self, stream: BinaryIO, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 depth: int = DEFAULT_DEPTH) -> None:
+        if chunk_size < 1 or depth < 1:
+            raise ValueError("chunk_size and depth must be at least 1")
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.depth = depth
+
+        self._free: queue.Queue[bytearray] = queue.Queue()
+        for _ in range(depth + 1):
+            self._free.put(bytearray(chunk_size))
+        self._filled: queue.Queue = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._reader, daemon=True,
+                                        name="read-ahead")
+        self._thread.start()
+
+    def __enter__(self) -> ReadAhead:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _reader(self) -> None:
+        readinto = getattr(self.stream, "readinto", None)
+        try:
+            while True:
+                buf = self._free.get()
+                if self._stop.is_set():
+                    return
+                if readinto is not None:
+                    n = readinto(buf)
+                else:
+                    data = self.stream.read(self.chunk_size)
+                    n = len(data)
+                    buf[:n] = data
+                if not n:
+                    self._filled.put(_EOF)
+                    return
+                self._filled.put((buf, n))
+        except BaseException as e:  # re-raised in the consuming thread
+            self._filled.put(e)
+
+    def __iter__(self) -> Iterator[memoryview]:
+        previous = None
+        while True:
+            item = self._filled.get()
+            if previous is not None:
+                # The consumer is done with the last chunk: recycle it.
+                self._free.put(previous)
+                previous = None
+            if item is _EOF:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            buf, n = item
+            previous = buf
+            yield memoryview(buf)[:n]
+
+    def close(self) -> None:
+        """Stop the reader thread (it may finish one in-flight read)."""
+        self._stop.set()
+        self._free.put(bytearray(0))  # wake the reader if it is waiting
+        self._thread.join(timeout=1.0)
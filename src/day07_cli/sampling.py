@@ -0,0 +1,165 @@
+"""Quick estimates for huge files by reading a random sample of blocks.
+
+The file is divided into fixed-size blocks and a random subset is read
+with ``seek()``, so the running time depends on the sample size, not the
+file size. Each word and each ``"\\n"`` belongs to exactly one block (the
+block holding its first byte): a block skips the partial word it starts
+in and reads a little past its end to finish its last word.
+
+Totals are extrapolated with a ratio estimator (count per byte sampled,
+times file size) and reported with a 95% confidence interval that
+includes the finite-population correction, so sampling every block gives
+the exact answer with a zero-width interval.
+
+Line estimates count ``"\\n"`` line endings (``"\\r\\n"`` included), plus
+one for a final unterminated line when the last block is sampled.
+"""
+
+from __future__ import annotations
+
+import math
+import random
+from pathlib import Path
+from typing import BinaryIO, Callable, NamedTuple
+
+from text_utils import word_frequencies
+
+
+DEFAULT_BLOCK_SIZE = 64 * 1024
+
+# z-score for a two-sided 95% confidence interval.
+Z_95 = 1.959964
+
+# How far past a block's end we read, at most, to finish its last word.
+_MAX_WORD_OVERRUN = 64 * 1024
+
+_ASCII_SPACES = b" \t\n\r\v\f"
+
+
+def _first_space(data: bytes) -> int:
+    """Index of the first ASCII whitespace byte in ``data``, or its length."""
+    found = [i for i in map(data.find, (bytes([c]) for c in _ASCII_SPACES))
+             if i >= 0]
+    return min(found, default=len(data))
+
+
+class Estimate(NamedTuple):
+    """An extrapolated total with its 95% confidence interval."""
+    value: float
+    low: float
+    high: float
+
+
+class SampleReport(NamedTuple):
+    """Everything ``sample_file`` found; word counts in ``top_words`` are
+    extrapolated to the whole file."""
+    file_size: int
+    blocks_total: int
+    blocks_sampled: int
+    lines: Estimate
+    words: Estimate
+    top_words: list[tuple[str, float]]
+
+
+class _Block(NamedTuple):
+    size: int
+    lines: int
+    words: int
+    freq: dict[str, int]
+
+
+def _read_block(f: BinaryIO, start: int, size: int, file_size: int,
+                normalizer: Callable[[str], str] | None) -> _Block:
+    end = min(start + size, file_size)
+
+    # Read one byte before the block to know if it starts mid-word.
+    lead = 1 if start > 0 else 0
+    f.seek(start - lead)
+    data = f.read(end - start + lead)
+    prev_is_space = not lead or data[0] in _ASCII_SPACES
+    body = data[lead:]
+
+    # Skip the word that started in the previous block.
+    begin = 0 if prev_is_space else _first_space(body)
+
+    # Finish the last word that starts inside this block (if any does).
+    tail = b""
+    if (end < file_size and begin < len(body)
+            and body[-1] not in _ASCII_SPACES):
+        extra = f.read(_MAX_WORD_OVERRUN)
+        tail = extra[:_first_space(extra)]
+
+    lines = body.count(b"\n")
+    if end == file_size and body and not body.endswith(b"\n"):
+        lines += 1  # final line without a trailing newline
+
+    text = (body[begin:] + tail).decode("utf-8", errors="replace")
+    freq = word_frequencies(text, normalizer)
+    return _Block(len(body), lines, sum(freq.values()), freq)
+
+
+def _ratio_estimate(values: list[int], sizes: list[int], file_size: int,
+                    blocks_total: int) -> Estimate:
+    k = len(values)
+    sampled_bytes = sum(sizes)
+    if not sampled_bytes:
+        return Estimate(0.0, 0.0, 0.0)
+    ratio = sum(values) / sampled_bytes
+    value = ratio * file_size
+    if k == blocks_total:
+        return Estimate(value, value, value)  # every block was read
+    if k < 2:
+        return Estimate(value, 0.0, math.inf)
+
+    # Variance of the ratio estimator, with finite-population correction.
+    residual_var = sum((v - ratio * b) ** 2
+                       for v, b in zip(values, sizes)) / (k - 1)
+    fpc = 1 - k / blocks_total
+    se = blocks_total * math.sqrt(fpc * residual_var / k)
+    return Estimate(value, max(0.0, value - Z_95 * se), value + Z_95 * se)
+
+
+def sample_file(path: Path, fraction: float,
+                block_size: int = DEFAULT_BLOCK_SIZE, top: int = 5,
+                seed: int | None = None,
+                normalizer: Callable[[str], str] | None = None
+                ) -> SampleReport:
+    """Estimate line/word counts and common words from a random sample.
+
+    ``fraction`` is the share of blocks to read (at least one block).
+
+    Raises:
+        ValueError: if ``fraction`` is not in (0, 1].
+        OSError: if the file can't be read.
+    """
+    if not 0 < fraction <= 1:
+        raise ValueError("fraction must be in (0, 1]")
+
+    file_size = path.stat().st_size
+    blocks_total = max(1, math.ceil(file_size / block_size))
+    k = min(blocks_total, max(1, round(fraction * blocks_total)))
+    rng = random.Random(seed)
+    # Sorted so the disk sees forward seeks only.
+    chosen = sorted(rng.sample(range(blocks_total), k))
+
+    blocks = []
+    with path.open("rb") as f:
+        for index in chosen:
+            blocks.append(_read_block(f, index * block_size, block_size,
+                                      file_size, normalizer))
+
+    sizes = [b.size for b in blocks]
+    lines = _ratio_estimate([b.lines for b in blocks], sizes, file_size,
+                            blocks_total)
+    words = _ratio_estimate([b.words for b in blocks], sizes, file_size,
+                            blocks_total)
+
+    merged: dict[str, int] = {}
+    for block in blocks:
+        for w, c in block.freq.items():
+            merged[w] = merged.get(w, 0) + c
+    scale = file_size / sum(sizes) if sum(sizes) else 0.0
+    top_words = sorted(merged.items(), key=lambda kv: kv[1],
+                       reverse=True)[:top]
+    return SampleReport(file_size, blocks_total, k, lines, words,
+                        [(w, c * scale) for w, c in top_words])
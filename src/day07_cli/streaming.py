@@ -0,0 +1,285 @@
+"""Incremental text statistics over a stream of bytes.
+
+``TextStats`` accepts input in arbitrary chunks (from a file, a pipe or
+``sys.stdin.buffer``) and keeps only running totals, so memory does not
+grow with the size of the input. Results match the whole-text functions
+in ``text_utils``:
+
+- line counts follow ``str.splitlines()``
+- words are whitespace-separated tokens normalized by ``normalize_word``
+
+Pure-ASCII chunks (the common case for logs and sequence files) are
+tokenized and case-folded directly on ``bytes``; only the distinct words
+of each chunk are decoded. Anything else goes through the exact ``str``
+path.
+
+Chunks are cut after the last ASCII whitespace byte; the tail is carried
+over to the next chunk. That keeps words and multi-byte UTF-8 characters
+whole, and a trailing ``\\r`` is held back as well so a ``\\r\\n`` pair
+split across two chunks is still one line break.
+"""
+
+from __future__ import annotations
+
+import copy
+from collections import Counter
+from string import punctuation
+from typing import BinaryIO, Callable, Iterable, Iterator, Protocol
+
+from text_utils import normalize_word
+
+
+DEFAULT_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+# Characters that ``str.splitlines()`` treats as line boundaries.
+LINE_BREAKS = frozenset("\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029")
+
+# Whitespace bytes that can never be part of a multi-byte UTF-8 character.
+_ASCII_SPACES = (b" ", b"\n", b"\t", b"\r", b"\v", b"\f")
+
+# ASCII characters that ``str`` treats as whitespace or line breaks but
+# ``bytes.split()``/``bytes.splitlines()`` do not (or not the same way).
+# Chunks containing any of them take the ``str`` path.
+_NOT_BYTES_SAFE = (b"\x0b", b"\x0c", b"\x1c", b"\x1d", b"\x1e", b"\x1f")
+
+_PUNCTUATION_BYTES = punctuation.encode("ascii")
+
+
+def _normalize_ascii(token: bytes) -> str:
+    """``normalize_word`` for an ASCII token, without decoding it first."""
+    return token.strip(_PUNCTUATION_BYTES).lower().decode("ascii")
+
+
+class WordSink(Protocol):
+    """Anything that consumes normalized words in order (see ``sinks``)."""
+
+    def update(self, words: Iterable[str]) -> None: ...
+
+
+class WordCounter(Protocol):
+    """A frequency table kept outside ``TextStats`` (see ``counter``)."""
+
+    def add(self, counts: dict[str, int]) -> None: ...
+
+    def most_common(self, k: int) -> list[tuple[str, int]]: ...
+
+
+class IdWordCounter(WordCounter, Protocol):
+    """A ``WordCounter`` keyed by word ID (e.g. ``vocab.IdCounter``).
+
+    ``TextStats`` feeds it per-token IDs instead of a ``str -> int`` dict.
+    """
+
+    def token_ids(self, normalize: Callable) -> dict: ...
+
+    def add_tokens(self, tokens: list, token_ids: dict) -> int: ...
+
+
+def iter_chunks(stream: BinaryIO,
+                chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield successive chunks of at most ``chunk_size`` bytes."""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+class TextStats:
+    """Running line/word statistics fed by ``feed()``.
+
+    Args:
+        frequencies: keep a word -> count table (needed for the most
+            common word). Turn off when only totals are wanted.
+        sinks: extra consumers (e.g. ``UniqueCounter``, ``NgramCounter``)
+            that receive the normalized words of every chunk, in order.
+        counter: an alternative frequency table (e.g. ``ExternalCounter``)
+            that receives per-chunk word counts. Used instead of the
+            in-memory ``frequencies`` dict. An ``IdWordCounter`` (e.g.
+            ``vocab.IdCounter``) receives word IDs instead.
+        normalizer: token -> word function (e.g. ``normalize.Normalizer``)
+            replacing the default ``normalize_word``.
+    """
+
+    def __init__(self, frequencies: bool = True,
+                 sinks: Iterable[WordSink] = (),
+                 counter: WordCounter | None = None,
+                 normalizer: Callable[[str], str] | None = None) -> None:
+        self.counter = counter
+        self.normalizer = normalizer
+        if normalizer is None:
+            self._normalize_text = normalize_word
+            self._normalize_ascii = _normalize_ascii
+        else:
+            self._normalize_text = normalizer
+            self._normalize_ascii = (
+                lambda token: normalizer(token.decode("ascii")))
+        self.frequencies: dict[str, int] | None = (
+            {} if frequencies and counter is None else None)
+        # Raw token -> word ID, when the counter counts by ID: each
+        # distinct token is then normalized once per run, not per chunk.
+        self._token_ids = (counter.token_ids(self._normalize_token)
+                           if hasattr(counter, "token_ids") else None)
+        self.sinks = list(sinks)
+        self.word_count = 0
+        self.bytes_read = 0
+
+        self._carry = b""
+        self._terminated_lines = 0
+        self._open_line = False
+
+    @property
+    def line_count(self) -> int:
+        """Lines seen so far, counting an unterminated last line."""
+        return self._terminated_lines + self._open_line
+
+    def feed(self, chunk: bytes) -> None:
+        """Process the next ``chunk`` of UTF-8 encoded input.
+
+        Raises:
+            UnicodeDecodeError: if the input is not valid UTF-8.
+        """
+        self.bytes_read += len(chunk)
+        data = self._carry + chunk if self._carry else bytes(chunk)
+
+        cut = max(data.rfind(space) for space in _ASCII_SPACES) + 1
+        if cut == 0:
+            # No safe cut point yet: the whole chunk is one partial word.
+            self._carry = data
+            return
+
+        if data[cut - 1] == 0x0D:  # hold back "\r" in case "\n" follows
+            cut -= 1
+        self._carry = data[cut:]
+        self._process(data[:cut])
+
+    def finish(self) -> None:
+        """Flush the carried-over tail; call once the input is exhausted.
+
+        Safe to call more than once, e.g. to read partial results after
+        an interrupt.
+        """
+        data, self._carry = self._carry, b""
+        self._process(data)
+
+    def finished_copy(self) -> TextStats:
+        """Return these statistics as if the input ended here.
+
+        ``finish()`` would consume the carried-over tail, so a stream
+        that is still growing (``--watch``) reports from a copy instead:
+        ``self`` keeps its tail and can go on being fed. Without a
+        pending tail no copy is needed and ``self`` is returned.
+        """
+        if not self._carry:
+            return self
+        # The normalizer is stateless apart from its memo: share it.
+        memo = {id(self.normalizer): self.normalizer}
+        clone = copy.deepcopy(self, memo)
+        clone.finish()
+        return clone
+
+    def most_common_word(self) -> str:
+        """Return the most common word so far, or empty string if none."""
+        if self.counter is not None:
+            top = self.counter.most_common(1)
+            return top[0][0] if top else ""
+        freq = self.frequencies
+        if not freq:
+            return ""
+        return max(freq, key=freq.get)
+
+    def _process(self, data: bytes) -> None:
+        if not data:
+            return
+        # Single-byte ``in`` checks are memchr scans, far cheaper than a
+        # regex or a decode.
+        if data.isascii() and not any(b in data for b in _NOT_BYTES_SAFE):
+            self._process_ascii(data)
+        else:
+            self._process_text(data.decode("utf-8"))
+
+    def _process_ascii(self, data: bytes) -> None:
+        # Only "\n", "\r" and "\r\n" can break lines in this data.
+        crs = data.count(b"\r")
+        breaks = data.count(b"\n") + crs
+        if crs:
+            breaks -= data.count(b"\r\n")
+        self._terminated_lines += breaks
+        self._open_line = data[-1] not in b"\n\r"
+
+        self._count_tokens(data.split(), self._normalize_ascii)
+
+    def _process_text(self, text: str) -> None:
+        parts = text.splitlines()
+        if text[-1] in LINE_BREAKS:
+            self._terminated_lines += len(parts)
+            self._open_line = False
+        else:
+            self._terminated_lines += len(parts) - 1
+            self._open_line = True
+
+        self._count_tokens(text.split(), self._normalize_text)
+
+    def _normalize_token(self, token: bytes | str) -> str:
+        if isinstance(token, bytes):
+            return self._normalize_ascii(token)
+        return self._normalize_text(token)
+
+    def _count_tokens(self, tokens: list, normalize: Callable) -> None:
+        if self._token_ids is not None:
+            # ID-based counter: tokens go straight to their (memoized)
+            # word IDs, with no per-chunk word dict.
+            self.word_count += self.counter.add_tokens(tokens,
+                                                       self._token_ids)
+            if self.sinks:
+                self._feed_sinks(tokens, {token: normalize(token)
+                                          for token in set(tokens)})
+            return
+
+        # Count raw tokens first (done in C by Counter), then normalize
+        # each distinct token once instead of once per occurrence.
+        raw = Counter(tokens)
+        normalized = {token: normalize(token) for token in raw}
+
+        freq = self.frequencies
+        chunk_freq: dict[str, int] | None = (
+            {} if self.counter is not None else None)
+        for token, count in raw.items():
+            w = normalized[token]
+            if not w:
+                continue
+            self.word_count += count
+            if freq is not None:
+                freq[w] = freq.get(w, 0) + count
+            if chunk_freq is not None:
+                chunk_freq[w] = chunk_freq.get(w, 0) + count
+        if chunk_freq:
+            self.counter.add(chunk_freq)
+
+        if self.sinks:
+            self._feed_sinks(tokens, normalized)
+
+    def _feed_sinks(self, tokens: list, normalized: dict[str, str]) -> None:
+        words = [w for w in map(normalized.__getitem__, tokens) if w]
+        for sink in self.sinks:
+            sink.update(words)
+
+
+def analyze_chunks(chunks: Iterable[bytes], stats: TextStats) -> TextStats:
+    """Feed every chunk from ``chunks`` into ``stats`` and return ``stats``.
+
+    ``stats.finish()`` is called even if reading is interrupted (for
+    example by Ctrl-C), so the totals gathered so far stay usable.
+    """
+    try:
+        for chunk in chunks:
+            stats.feed(chunk)
+    finally:
+        stats.finish()
+    return stats
+
+
+def analyze_stream(stream: BinaryIO, stats: TextStats,
+                   chunk_size: int = DEFAULT_CHUNK_SIZE) -> TextStats:
+    """Feed ``stream`` into ``stats`` chunk by chunk and return ``stats``."""
+    return analyze_chunks(iter_chunks(stream, chunk_size), stats)
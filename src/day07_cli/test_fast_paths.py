@@ -0,0 +1,838 @@
+"""Differential tests: every fast path must match the reference functions.
+
+The reference is ``text_utils.count_lines`` / ``word_frequencies`` on the
+whole decoded text. Each accelerated engine is fed random and adversarial
+corpora (Unicode punctuation, punctuation-only tokens, every line ending
+``str.splitlines()`` knows, words split across chunk boundaries) and has
+to produce exactly the same numbers.
+
+Run from this directory:
+    python -m unittest test_fast_paths
+"""
+
+import contextlib
+import csv
+import importlib.util
+import io
+import json
+import random
+import sys
+import tempfile
+import time
+import unittest
+from collections import Counter
+from pathlib import Path
+from unittest import mock
+
+import main
+from cardinality import HyperLogLog, UniqueCounter
+from cooccur import CooccurrenceMatrix, cooccurrence_file
+from export import export_frequencies, frequency_rows
+from external_count import ExternalCounter, parse_size
+from line_index import LineIndex, read_lines, sidecar_path
+from minhash import MinHasher, find_duplicates, file_signature, similarity
+from ngrams import NgramCounter
+from normalize import ENGLISH_STOPWORDS, Normalizer, build_normalizer, stem
+from readahead import ReadAhead
+from sampling import sample_file
+from streaming import TextStats, analyze_chunks, analyze_stream
+from text_utils import (count_lines, iter_words, most_common_word,
+                        word_frequencies)
+from vocab import IdCounter, id_frequencies
+from watch import FileTail
+
+
+SEEDS = range(40)
+
+# Building blocks for random corpora. Mixed in on purpose: ASCII and
+# Unicode punctuation, tokens that are nothing but punctuation, case
+# variants, multi-byte characters and every kind of line break.
+WORDS = [
+    "gene", "Gene", "GENE", "ACGT", "acgt", "can't", "it's", "e.g.",
+    "naïve", "Straße", "İstanbul", "日本語", "données", "🧬dna",
+    "«quoted»", "“smart”", "¿qué?", "¡sí!", "—dash—", "end…",
+]
+PUNCT_ONLY = ["...", "--", "!?", "“”", "«»", "…", "'", "()", "—"]
+SPACES = [" ", " ", " ", "\t", "  ", "\xa0", "\u3000"]
+BREAKS = ["\n", "\n", "\r\n", "\r", "\v", "\f", "\x1c", "\x1d", "\x1e",
+          "\x85", "\u2028", "\u2029"]
+
+
+def random_corpus(rng: random.Random, n_tokens: int,
+                  ascii_only: bool = False) -> str:
+    """Build a text of roughly ``n_tokens`` tokens with random separators."""
+    words = WORDS + PUNCT_ONLY
+    spaces, breaks = SPACES, BREAKS
+    if ascii_only:
+        words = [w for w in words if w.isascii()]
+        spaces = [s for s in spaces if s.isascii()]
+        breaks = ["\n", "\n", "\r\n", "\r"]
+
+    parts = []
+    for _ in range(n_tokens):
+        parts.append(rng.choice(words))
+        roll = rng.random()
+        if roll < 0.15:
+            parts.append(rng.choice(breaks))
+        elif roll < 0.95:
+            parts.append(rng.choice(spaces))
+        # else: glue the next token on, making longer odd tokens
+    if rng.random() < 0.5:
+        parts.append(rng.choice(breaks))
+    return "".join(parts)
+
+
+def random_chunks(rng: random.Random, data: bytes):
+    """Split ``data`` at random points (including mid-character)."""
+    i = 0
+    while i < len(data):
+        step = rng.choice([1, 2, 3, 5, 17, 64, 1000])
+        yield data[i:i + step]
+        i += step
+
+
+def stream_stats(data: bytes, chunks=None, **kwargs) -> TextStats:
+    """Run ``TextStats`` over ``data`` fed as ``chunks`` (default: whole)."""
+    stats = TextStats(**kwargs)
+    for chunk in chunks if chunks is not None else [data]:
+        stats.feed(chunk)
+    stats.finish()
+    return stats
+
+
+class ReferenceCase(unittest.TestCase):
+    def assertMatchesReference(self, text: str, stats: TextStats) -> None:
+        freq = word_frequencies(text)
+        self.assertEqual(stats.line_count, count_lines(text))
+        self.assertEqual(stats.word_count, sum(freq.values()))
+        if stats.frequencies is not None:
+            # Same contents *and* insertion order, so ties for the most
+            # common word break the same way.
+            self.assertEqual(list(stats.frequencies.items()),
+                             list(freq.items()))
+            self.assertEqual(stats.most_common_word(), most_common_word(text))
+
+
+class TestStreamingMatchesReference(ReferenceCase):
+
+    def test_random_corpora_random_chunks(self):
+        for seed in SEEDS:
+            rng = random.Random(seed)
+            text = random_corpus(rng, rng.randint(0, 400))
+            data = text.encode("utf-8")
+            with self.subTest(seed=seed):
+                self.assertMatchesReference(
+                    text, stream_stats(data, random_chunks(rng, data)))
+
+    def test_ascii_corpora_random_chunks(self):
+        for seed in SEEDS:
+            rng = random.Random(seed)
+            text = random_corpus(rng, rng.randint(0, 400), ascii_only=True)
+            data = text.encode("ascii")
+            with self.subTest(seed=seed):
+                self.assertMatchesReference(
+                    text, stream_stats(data, random_chunks(rng, data)))
+
+    def test_every_split_point(self):
+        # Words, "\r\n" pairs and multi-byte characters cut at every
+        # possible position.
+        text = "Hello, naïve\r\nworld!\rcan't 日本語\u2028end\x1c...\r\n"
+        data = text.encode("utf-8")
+        for cut in range(len(data) + 1):
+            with self.subTest(cut=cut):
+                self.assertMatchesReference(
+                    text, stream_stats(data, [data[:cut], data[cut:]]))
+
+    def test_byte_at_a_time(self):
+        rng = random.Random(7)
+        text = random_corpus(rng, 200)
+        data = text.encode("utf-8")
+        chunks = [data[i:i + 1] for i in range(len(data))]
+        self.assertMatchesReference(text, stream_stats(data, chunks))
+
+    def test_edge_cases(self):
+        cases = ["", " ", "\n", "\r", "\r\n", "\n\n", "\r\r\n", "a", "a\n",
+                 "a\rb", "...", "... ---\n!!", "\x1c\x1d", "\x85", "\ufeffa",
+                 "a\x0bb\x0cc", "a\x1fb", "Hi, hi. HI!", "can't can't"]
+        for text in cases:
+            for size in (1, 2, 4096):
+                with self.subTest(text=text, chunk_size=size):
+                    stats = analyze_stream(io.BytesIO(text.encode("utf-8")),
+                                           TextStats(), size)
+                    self.assertMatchesReference(text, stats)
+
+    def test_without_frequency_table(self):
+        rng = random.Random(3)
+        text = random_corpus(rng, 300)
+        stats = stream_stats(text.encode("utf-8"), frequencies=False)
+        self.assertIsNone(stats.frequencies)
+        self.assertMatchesReference(text, stats)
+
+    def test_invalid_utf8_raises(self):
+        with self.assertRaises(UnicodeDecodeError):
+            stream_stats(b"ok \xff\xfe bad\n")
+
+
+class TestNormalizer(unittest.TestCase):
+
+    def test_default_chain_matches_normalize_word(self):
+        for seed in SEEDS:
+            rng = random.Random(seed)
+            text = random_corpus(rng, 300)
+            with self.subTest(seed=seed):
+                self.assertEqual(
+                    list(word_frequencies(text, Normalizer()).items()),
+                    list(word_frequencies(text).items()))
+
+    def test_streaming_with_custom_chain(self):
+        normalizer = build_normalizer(ENGLISH_STOPWORDS, stemming=True)
+        for seed in SEEDS:
+            rng = random.Random(seed)
+            ascii_only = seed % 2 == 0
+            text = random_corpus(rng, 300, ascii_only) + " The running cats"
+            data = text.encode("utf-8")
+            stats = stream_stats(data, random_chunks(rng, data),
+                                 normalizer=normalizer)
+            expected = word_frequencies(text, normalizer)
+            with self.subTest(seed=seed):
+                self.assertEqual(stats.frequencies, expected)
+                self.assertEqual(stats.word_count, sum(expected.values()))
+                self.assertNotIn("the", stats.frequencies)
+                self.assertIn("run", stats.frequencies)
+
+    def test_stem_examples(self):
+        cases = {"running": "run", "cats": "cat", "classes": "class",
+                 "studies": "study", "agreed": "agree", "bus": "bus",
+                 "is": "is", "sing": "sing", "national": "national",
+                 "this": "this", "apply": "apply", "reply": "reply",
+                 "family": "family", "analysis": "analysis",
+                 "species": "species", "genes": "gene", "notes": "note",
+                 "samples": "sample", "values": "value", "boxes": "box",
+                 "wishes": "wish", "makes": "make", "making": "make",
+                 "related": "relate"}
+        for word, expected in cases.items():
+            with self.subTest(word=word):
+                self.assertEqual(stem(word), expected)
+
+    def test_memo_is_bounded(self):
+        normalizer = Normalizer(cache_size=10)
+        for i in range(100):
+            normalizer(f"Word{i}!")
+        self.assertEqual(normalizer.cache_info().currsize, 10)
+
+
+class TestSampling(unittest.TestCase):
+
+    def test_full_sample_is_exact(self):
+        # Every block read: no word may be lost or counted twice at a
+        # block boundary, whatever the block size.
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "corpus.txt"
+            for seed in range(10):
+                rng = random.Random(seed)
+                text = random_corpus(rng, 500).replace("\r", "")
+                text = "\n".join(text.splitlines())
+                path.write_bytes(text.encode("utf-8"))
+                for block_size in (1, 7, 100, 4096):
+                    report = sample_file(path, 1.0, block_size)
+                    with self.subTest(seed=seed, block_size=block_size):
+                        self.assertEqual(report.words.value,
+                                         sum(word_frequencies(text).values()))
+                        self.assertEqual(report.lines.value,
+                                         count_lines(text))
+                        self.assertEqual(report.words.low,
+                                         report.words.high)
+
+    def test_partial_sample_interval(self):
+        rng = random.Random(1)
+        lines = [" ".join(rng.choices(WORDS, k=rng.randint(1, 12)))
+                 for _ in range(20_000)]
+        text = "\n".join(lines) + "\n"
+        words = sum(word_frequencies(text).values())
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "corpus.txt"
+            path.write_bytes(text.encode("utf-8"))
+            hits = 0
+            for seed in range(20):
+                report = sample_file(path, 0.2, 4096, seed=seed)
+                self.assertLess(report.blocks_sampled, report.blocks_total)
+                hits += report.words.low <= words <= report.words.high
+        # A 95% interval should contain the truth nearly every time.
+        self.assertGreaterEqual(hits, 16)
+
+
+class TestLineIndex(unittest.TestCase):
+
+    def test_matches_count_lines(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "corpus.txt"
+            for seed in range(10):
+                rng = random.Random(seed)
+                lines = random_corpus(rng, 300).replace("\r", "").splitlines()
+                ending = "\r\n" if seed % 2 else "\n"
+                text = ending.join(lines) + ending * (seed % 3 == 0)
+                path.write_bytes(text.encode("utf-8"))
+                for chunk_size in (1, 5, 4096):
+                    index = LineIndex.build(path, chunk_size)
+                    with self.subTest(seed=seed, chunk_size=chunk_size):
+                        self.assertEqual(index.line_count, count_lines(text))
+                        self.assertFalse(index.other_breaks)
+                        self.assertEqual(read_lines(path, 2, 7),
+                                         text.splitlines()[2:7])
+                    index.close()
+
+    def test_rebuilt_when_stale(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "corpus.txt"
+            path.write_text("a\nb\n")
+            with LineIndex.open(path) as index:
+                self.assertEqual(index.line_count, 2)
+            self.assertTrue(sidecar_path(path).exists())
+            path.write_text("a\nb\nc\nd")
+            with LineIndex.open(path) as index:
+                self.assertEqual(index.line_count, 4)
+                self.assertEqual(index.byte_range(1, 3), (2, 6))
+            sidecar_path(path).write_bytes(b"garbage")
+            with LineIndex.open(path) as index:
+                self.assertEqual(index.line_count, 4)
+
+    def test_flags_other_line_breaks(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "corpus.txt"
+            for sep in ("\r", "\x0b", "\x1c", "\x85", "\u2028"):
+                path.write_text(f"one two{sep}three\r\nfour\r",
+                                encoding="utf-8", newline="")
+                for chunk_size in (1, 2, 4096):
+                    with self.subTest(sep=sep, chunk_size=chunk_size), \
+                            LineIndex.build(path, chunk_size) as index:
+                        self.assertTrue(index.other_breaks)
+
+    def test_rebuilt_when_body_is_truncated(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "corpus.txt"
+            path.write_text("a\nb\nc\nd\n")
+            index_path = sidecar_path(path)
+            for cut in (3, 8):
+                LineIndex.build(path).close()
+                data = index_path.read_bytes()
+                index_path.write_bytes(data[:-cut])
+                with self.subTest(cut=cut), LineIndex.open(path) as index:
+                    self.assertEqual(index.line_count, 4)
+                    self.assertEqual(index.byte_range(3, 4), (6, 8))
+                self.assertEqual(index_path.read_bytes(), data)
+
+    def test_shards_cover_file(self):
+        text = "".join(f"line {i}\n" for i in range(1000)).encode()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "corpus.txt"
+            path.write_bytes(text)
+            with LineIndex.open(path) as index:
+                for shards in (1, 3, 8, 5000):
+                    ranges = index.shard_ranges(shards)
+                    self.assertEqual(b"".join(text[a:b] for a, b in ranges),
+                                     text)
+                    self.assertTrue(all(text[a - 1:a] in (b"", b"\n")
+                                        for a, _ in ranges))
+
+
+class TestReadAhead(ReferenceCase):
+
+    def test_prefetched_chunks_match_reference(self):
+        for seed in range(10):
+            rng = random.Random(seed)
+            text = random_corpus(rng, rng.randint(0, 400))
+            for chunk_size, depth in ((1, 1), (7, 2), (64, 4)):
+                stream = io.BytesIO(text.encode("utf-8"))
+                with ReadAhead(stream, chunk_size, depth) as chunks:
+                    stats = analyze_chunks(chunks, TextStats())
+                with self.subTest(seed=seed, chunk_size=chunk_size):
+                    self.assertMatchesReference(text, stats)
+
+    def test_read_errors_reach_the_consumer(self):
+        class Broken(io.RawIOBase):
+            def readinto(self, b):
+                raise OSError("disk on fire")
+
+        with self.assertRaises(OSError):
+            with ReadAhead(Broken(), 16) as chunks:
+                list(chunks)
+
+    def test_early_close_stops_reader(self):
+        stream = io.BytesIO(b"word " * 10_000)
+        reader = ReadAhead(stream, 8, depth=2)
+        next(iter(reader))
+        reader.close()
+        self.assertFalse(reader._thread.is_alive())
+
+
+class TestExternalCounter(ReferenceCase):
+
+    def test_spilling_matches_in_memory(self):
+        for seed in SEEDS:
+            rng = random.Random(seed)
+            text = random_corpus(rng, rng.randint(0, 400))
+            data = text.encode("utf-8")
+            # A tiny budget forces a spill every few new words.
+            with ExternalCounter(max_memory=1_000) as counter:
+                stats = stream_stats(data, random_chunks(rng, data),
+                                     counter=counter)
+                freq = word_frequencies(text)
+                with self.subTest(seed=seed):
+                    self.assertEqual(dict(counter.items()), freq)
+                    self.assertEqual(stats.most_common_word(),
+                                     most_common_word(text))
+                    self.assertMatchesReference(text, stats)
+
+    def test_multi_pass_merge(self):
+        words = [f"w{i % 997}" for i in range(20_000)]
+        freq = Counter(words)
+        with ExternalCounter(max_memory=20_000) as counter:
+            for i in range(0, len(words), 50):
+                counter.add(Counter(words[i:i + 50]))
+            self.assertGreater(len(counter.runs), 64)
+            self.assertEqual(dict(counter.items()), dict(freq))
+            self.assertEqual(counter.most_common(3), freq.most_common(3))
+
+    def test_parse_size(self):
+        self.assertEqual(parse_size("512"), 512)
+        self.assertEqual(parse_size("4k"), 4096)
+        self.assertEqual(parse_size("1.5M"), 3 << 19)
+        self.assertEqual(parse_size("2GB"), 2 << 30)
+        for bad in ("inf", "1e400", "nan", "-infK"):
+            with self.subTest(bad=bad), self.assertRaises(ValueError):
+                parse_size(bad)
+
+
+class TestIdCounter(ReferenceCase):
+
+    def test_matches_word_frequencies(self):
+        for seed in SEEDS:
+            rng = random.Random(seed)
+            text = random_corpus(rng, rng.randint(0, 400))
+            data = text.encode("utf-8")
+            counter = IdCounter()
+            unique = UniqueCounter()
+            stats = stream_stats(data, random_chunks(rng, data),
+                                 sinks=[unique], counter=counter)
+            freq = word_frequencies(text)
+            by_count = sorted(freq.items(), key=lambda kv: kv[1],
+                              reverse=True)
+            with self.subTest(seed=seed):
+                self.assertEqual(list(counter.to_dict().items()),
+                                 list(freq.items()))
+                self.assertEqual(list(id_frequencies(text).to_dict().items()),
+                                 list(freq.items()))
+                self.assertEqual(list(counter.by_count()), by_count)
+                self.assertEqual(counter.most_common(3), by_count[:3])
+                self.assertEqual(unique.count(), len(freq))
+                self.assertEqual(stats.most_common_word(),
+                                 most_common_word(text))
+                self.assertMatchesReference(text, stats)
+
+    def test_top_k_ties_go_to_first_seen(self):
+        counter = IdCounter()
+        counter.update("d c b a c b a b a".split())
+        counter.update(["e", "d", "d"])
+        self.assertEqual(counter.most_common(2), [("d", 3), ("b", 3)])
+        self.assertEqual(counter.most_common(4),
+                         [("d", 3), ("b", 3), ("a", 3), ("c", 2)])
+        self.assertEqual(counter.total, 12)
+        self.assertEqual(counter.count("e"), 1)
+        self.assertEqual(counter.count("zzz"), 0)
+
+
+def window_pairs(words: list[str], window: int) -> Counter:
+    """Brute-force symmetric co-occurrence counts."""
+    pairs = Counter()
+    for i, a in enumerate(words):
+        for j in range(max(0, i - window), min(len(words), i + window + 1)):
+            if j != i:
+                pairs[a, words[j]] += 1
+    return pairs
+
+
+class TestCooccurrence(unittest.TestCase):
+
+    def test_chunked_updates_match_brute_force(self):
+        for seed in SEEDS[:10]:
+            rng = random.Random(seed)
+            words = list(iter_words(random_corpus(rng, 600)))
+            window = rng.randint(1, 4)
+            matrix = CooccurrenceMatrix(window, flush_pairs=100)
+            i = 0
+            while i < len(words):
+                n = rng.randint(0, 30)
+                matrix.update(words[i:i + n])
+                i += n
+            expected = window_pairs(words, window)
+            csr = matrix.to_csr()
+            with self.subTest(seed=seed, window=window):
+                self.assertEqual(sum(csr.data), sum(expected.values()))
+                for (a, b), count in expected.items():
+                    self.assertEqual(matrix.count(a, b), count)
+                self.assertEqual(len(csr.indptr), len(csr.words) + 1)
+
+            freq = word_frequencies(" ".join(words))
+            pruned = matrix.to_csr(min_count=5)
+            self.assertEqual(pruned.words,
+                             [w for w, c in freq.items() if c >= 5])
+
+    def test_sharded_file_matches_single_pass(self):
+        rng = random.Random(7)
+        text = random_corpus(rng, 4000)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "corpus.txt"
+            path.write_bytes(text.encode("utf-8"))
+            single = cooccurrence_file(path, 3).to_csr()
+            # Byte-offset shards: no line index is built or written.
+            by_bytes = cooccurrence_file(path, 3, workers=4).to_csr()
+            self.assertFalse(sidecar_path(path).exists())
+            LineIndex.build(path).close()
+            by_lines = cooccurrence_file(path, 3, workers=4).to_csr()
+        for sharded in (by_bytes, by_lines):
+            self.assertEqual(sharded.words, single.words)
+            for name in ("indptr", "indices", "data"):
+                self.assertEqual(list(getattr(sharded, name)),
+                                 list(getattr(single, name)))
+
+    def run_cli(self, *argv):
+        out = io.StringIO()
+        with mock.patch.object(sys, "argv", ["main.py", *argv]), \
+                contextlib.redirect_stdout(out):
+            main.main()
+        return out.getvalue()
+
+    def test_cli_workers_skip_the_single_pass(self):
+        rng = random.Random(8)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "corpus.txt"
+            path.write_bytes(random_corpus(rng, 2000).encode("utf-8"))
+            single = self.run_cli("-f", str(path), "--cooccur", "2")
+            with mock.patch.object(main, "read_input",
+                                   wraps=main.read_input) as read_input:
+                sharded = self.run_cli("-f", str(path), "--cooccur", "2",
+                                       "--workers", "3")
+                read_input.assert_not_called()
+                with_words = self.run_cli("-f", str(path), "--cooccur",
+                                          "2", "--workers", "3", "--words")
+                read_input.assert_called_once()
+        self.assertEqual(sharded, single)
+        self.assertTrue(with_words.startswith("Words: "))
+        self.assertTrue(with_words.endswith(single))
+
+
+class TestMinHash(unittest.TestCase):
+
+    def test_estimates_jaccard(self):
+        rng = random.Random(5)
+        hasher = MinHasher(num_perm=256)
+        words = random_corpus(rng, 2000).split()
+        a = hasher.shingles(" ".join(words))
+        b = hasher.shingles(" ".join(words[:1500]))
+        jaccard = len(a & b) / len(a | b)
+        estimate = similarity(hasher.signature(a), hasher.signature(b))
+        self.assertAlmostEqual(estimate, jaccard, delta=0.1)
+        self.assertEqual(hasher.signature(a), hasher.signature(set(a)))
+
+    def test_finds_near_duplicates_and_caches(self):
+        rng = random.Random(6)
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = []
+            for i in range(20):
+                path = Path(tmp) / f"doc{i}.txt"
+                path.write_text(random_corpus(rng, 600), encoding="utf-8")
+                paths.append(path)
+            copy = Path(tmp) / "copy.txt"
+            copy.write_text(paths[4].read_text(encoding="utf-8") + " tail",
+                            encoding="utf-8")
+            paths.append(copy)
+
+            binary = Path(tmp) / "binary.dat"
+            binary.write_bytes(b"\xff\xfe\x00")
+            skipped = []
+            found = find_duplicates(paths + [binary], threshold=0.8,
+                                    skipped=skipped)
+            self.assertEqual([(d.first, d.second) for d in found],
+                             [(paths[4], copy)])
+            self.assertEqual(skipped, [binary])
+
+            # A cached signature is returned as stored, even if bogus...
+            hasher = MinHasher()
+            sidecar = copy.with_name(copy.name + ".minhash")
+            data = bytearray(sidecar.read_bytes())
+            data[-4:] = b"\0\0\0\0"
+            sidecar.write_bytes(bytes(data))
+            cached = file_signature(copy, hasher)
+            self.assertEqual(cached[-1], 0)
+            # ...until the settings or the file change.
+            self.assertNotEqual(file_signature(copy, MinHasher(seed=2))[-1],
+                                0)
+            copy.write_text("something else entirely", encoding="utf-8")
+            self.assertEqual(find_duplicates(paths, threshold=0.8), [])
+
+
+class TestExport(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(5)
+        self.text = random_corpus(rng, 2_000)
+        self.data = self.text.encode("utf-8")
+        self.expected = sorted(word_frequencies(self.text).items(),
+                               key=lambda kv: kv[1], reverse=True)
+
+    def test_spilled_rows_match_in_memory_order(self):
+        with ExternalCounter(max_memory=1_000) as counter:
+            stats = stream_stats(self.data, counter=counter)
+            self.assertEqual(list(frequency_rows(stats)), self.expected)
+        stats = stream_stats(self.data)
+        self.assertEqual(list(frequency_rows(stats)), self.expected)
+
+    def test_csv_and_ndjson_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = Path(tmp) / "freq.csv"
+            ndjson_path = Path(tmp) / "freq.ndjson"
+            export_frequencies(self.expected, csv_path, "csv", batch_size=7)
+            export_frequencies(self.expected, ndjson_path, "ndjson",
+                               batch_size=7)
+
+            with csv_path.open(encoding="utf-8", newline="") as f:
+                rows = list(csv.reader(f))
+            self.assertEqual(rows[0], ["word", "count"])
+            self.assertEqual([(w, int(c)) for w, c in rows[1:]],
+                             self.expected)
+
+            with ndjson_path.open(encoding="utf-8") as f:
+                objs = [json.loads(line) for line in f]
+            self.assertEqual([(o["word"], o["count"]) for o in objs],
+                             self.expected)
+
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow"),
+                         "pyarrow not installed")
+    def test_parquet_round_trip(self):
+        import pyarrow.parquet as pq
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "freq.parquet"
+            export_frequencies(self.expected, path, "parquet", batch_size=7)
+            table = pq.read_table(path)
+        self.assertEqual(list(zip(table["word"].to_pylist(),
+                                  table["count"].to_pylist())),
+                         self.expected)
+
+
+class TestWordSinks(unittest.TestCase):
+
+    def test_sinks_see_reference_word_order(self):
+        for seed in SEEDS:
+            rng = random.Random(seed)
+            text = random_corpus(rng, 300)
+            data = text.encode("utf-8")
+            seen = []
+
+            class Recorder:
+                def update(self, words):
+                    seen.extend(words)
+
+            stream_stats(data, random_chunks(rng, data), sinks=[Recorder()])
+            with self.subTest(seed=seed):
+                self.assertEqual(seen, list(iter_words(text)))
+
+    def test_unique_counter_exact_below_limit(self):
+        for seed in SEEDS:
+            rng = random.Random(seed)
+            text = random_corpus(rng, 300)
+            counter = UniqueCounter()
+            stream_stats(text.encode("utf-8"), sinks=[counter])
+            with self.subTest(seed=seed):
+                self.assertTrue(counter.is_exact)
+                self.assertEqual(counter.count(), len(word_frequencies(text)))
+
+    def test_ngram_counter_matches_naive_tuples(self):
+        for seed in SEEDS:
+            rng = random.Random(seed)
+            text = random_corpus(rng, 300)
+            data = text.encode("utf-8")
+            words = list(iter_words(text))
+            for n in (1, 2, 3):
+                counter = NgramCounter(n)
+                stream_stats(data, random_chunks(rng, data), sinks=[counter])
+                expected = Counter(zip(*(words[i:] for i in range(n))))
+                got = {counter.decode(k): c for k, c in counter.counts.items()}
+                with self.subTest(seed=seed, n=n):
+                    self.assertEqual(got, dict(expected))
+
+
+class TestHyperLogLog(unittest.TestCase):
+
+    def test_estimate_within_error(self):
+        # precision 12 -> ~1.6% standard error; allow 5%.
+        for n in (1_000, 50_000):
+            sketch = HyperLogLog(12)
+            sketch.update(f"word{i}" for i in range(n))
+            with self.subTest(n=n):
+                self.assertLess(abs(sketch.estimate() - n) / n, 0.05)
+
+    def test_merge_equals_union(self):
+        a, b, both = HyperLogLog(10), HyperLogLog(10), HyperLogLog(10)
+        left = [f"w{i}" for i in range(0, 6000)]
+        right = [f"w{i}" for i in range(4000, 9000)]
+        a.update(left)
+        b.update(right)
+        both.update(left + right)
+        a.merge(HyperLogLog.from_bytes(b.to_bytes()))
+        self.assertEqual(a.registers, both.registers)
+
+    def test_counter_switches_to_sketch(self):
+        counter = UniqueCounter(exact_limit=100, precision=12)
+        counter.update(f"w{i}" for i in range(5_000))
+        self.assertFalse(counter.is_exact)
+        self.assertLess(abs(counter.count() - 5_000) / 5_000, 0.05)
+
+    def test_sketch_mode_matches_plain_sketch(self):
+        # Repeated words (deduplicated per batch) must not change the
+        # registers.
+        rng = random.Random(13)
+        words = [f"w{rng.randrange(3_000)}" for _ in range(50_000)]
+        counter = UniqueCounter(exact_limit=100, precision=12)
+        counter.update(words)
+        sketch = HyperLogLog(12)
+        sketch.update(words)
+        self.assertEqual(counter.sketch.registers, sketch.registers)
+
+
+class TestFileTail(ReferenceCase):
+
+    def test_appends_match_whole_file(self):
+        rng = random.Random(11)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "growing.txt"
+            path.write_bytes(b"")
+            tail = FileTail(path, TextStats, chunk_size=7)
+            text = ""
+            for _ in range(20):
+                piece = random_corpus(rng, rng.randint(0, 30))
+                with path.open("a", encoding="utf-8", newline="") as f:
+                    f.write(piece)
+                text += piece
+                tail.poll()
+            tail.stats.finish()
+            self.assertMatchesReference(text, tail.stats)
+
+    def test_truncation_starts_over(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "log.txt"
+            path.write_text("one two three\nfour\n", encoding="utf-8")
+            tail = FileTail(path, TextStats)
+            tail.poll()
+            path.write_text("x\n", encoding="utf-8")
+            self.assertTrue(tail.poll())
+            self.assertMatchesReference("x\n", tail.stats)
+
+    def test_unterminated_last_line_is_reported(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "log.txt"
+            path.write_text("one two\nthree four", encoding="utf-8")
+            with ExternalCounter(max_memory=1_000) as counter:
+                tail = FileTail(path, lambda: TextStats(
+                    sinks=[UniqueCounter()], counter=counter))
+                tail.poll()
+                report = tail.stats.finished_copy()
+                self.assertEqual(report.word_count, 4)
+                self.assertEqual(report.line_count, 2)
+                self.assertEqual(report.sinks[0].count(), 4)
+                self.assertEqual(dict(report.counter.items())["four"], 1)
+
+                # The live stats still carry "four": it may grow further.
+                with path.open("a", encoding="utf-8") as f:
+                    f.write("teen five\n")
+                tail.poll()
+                tail.stats.finish()
+                self.assertEqual(tail.stats.word_count, 5)
+                self.assertEqual(tail.stats.line_count, 2)
+                self.assertEqual(
+                    sorted(dict(counter.items())),
+                    ["five", "fourteen", "one", "three", "two"])
+
+
+class TestPerformanceBudgets(unittest.TestCase):
+    """Coarse wall-clock budgets that catch accidental quadratic paths.
+
+    The budgets are several times what a laptop needs, so they only fail
+    when something is badly wrong, not because the machine is busy.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        rng = random.Random(0)
+        vocab = [f"w{i}" for i in range(20_000)]
+        weights = [1 / (i + 1) for i in range(len(vocab))]  # Zipf-like
+        words = rng.choices(vocab, weights=weights, k=1_000_000)
+        lines = (" ".join(words[i:i + 12]) for i in range(0, len(words), 12))
+        cls.ascii_data = "\n".join(lines).encode("ascii") + b"\n"
+
+    def assertWithin(self, seconds, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        self.assertLess(elapsed, seconds,
+                        f"took {elapsed:.2f}s, budget {seconds}s")
+        return result
+
+    def test_stream_one_million_words(self):
+        stats = self.assertWithin(
+            10.0, analyze_stream, io.BytesIO(self.ascii_data), TextStats())
+        self.assertEqual(stats.word_count, 1_000_000)
+
+    def test_small_chunks_stay_linear(self):
+        stats = self.assertWithin(
+            15.0, analyze_stream, io.BytesIO(self.ascii_data[:1_000_000]),
+            TextStats(), 256)
+        self.assertGreater(stats.word_count, 0)
+
+    def test_stemming_faster_than_reference(self):
+        text = self.ascii_data.decode("ascii")
+
+        def best_of_three(*args):
+            times = []
+            for _ in range(3):
+                start = time.perf_counter()
+                word_frequencies(text, *args)
+                times.append(time.perf_counter() - start)
+            return min(times)
+
+        reference = best_of_three()
+        stemmed = best_of_three(
+            build_normalizer(ENGLISH_STOPWORDS, stemming=True))
+        # The memo makes the stemming pipeline cheaper than normalizing
+        # every occurrence; the margin below 1x absorbs timer noise.
+        self.assertLess(stemmed, reference * 0.95,
+                        f"stemming {stemmed:.2f}s, reference "
+                        f"{reference:.2f}s")
+
+    def test_id_frequencies_faster_than_dict(self):
+        text = self.ascii_data.decode("ascii")
+
+        def best_of_three(func):
+            times = []
+            for _ in range(3):
+                start = time.perf_counter()
+                func(text)
+                times.append(time.perf_counter() - start)
+            return min(times)
+
+        reference = best_of_three(word_frequencies)
+        ids = best_of_three(id_frequencies)
+        # Counting by ID skips the per-token dict write; the margin below
+        # 1x absorbs timer noise.
+        self.assertLess(ids, reference * 0.95,
+                        f"ids {ids:.2f}s, dict {reference:.2f}s")
+
+    def test_sinks_one_million_words(self):
+        sinks = [UniqueCounter(), NgramCounter(2)]
+        self.assertWithin(20.0, analyze_stream, io.BytesIO(self.ascii_data),
+                          TextStats(sinks=sinks))
+        self.assertEqual(sinks[0].count(), len(set(self.ascii_data.split())))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,12 +5,23 @@ Provides functions to:
 - count lines
 - compute word frequencies (case-insensitive, punctuation trimmed)
 - find the most common word
+- count distinct words without building a frequency table
+- find the most frequent n-grams (bigrams, trigrams, ...)
+
+The counting functions take an optional ``normalizer`` (see
+``normalize.Normalizer``) to replace the default punctuation/lowercase
+normalization, e.g. with stopword removal and stemming.
 """
 
 from __future__ import annotations
 
+from collections import Counter
 from pathlib import Path
 from string import punctuation
+from typing import Callable, Iterator
+
+from cardinality import UniqueCounter
+from ngrams import NgramCounter
 
 
 def read_text(file_path: Path) -> str:
@@ -27,8 +38,12 @@ def count_lines(text: str) -> int:
     return len(text.splitlines())
 
 
-def word_frequencies(text: str) -> dict[str, int]:
+def word_frequencies(text: str,
+                     normalizer: Callable[[str], str] | None = None
+                     ) -> dict[str, int]:
     """Return a frequency dictionary of normalized words in the text."""
+    if normalizer is not None:
+        return _normalized_frequencies(text, normalizer)
     freq: dict[str, int] = {}
     for token in text.split():
         w = token.strip(punctuation).lower()
@@ -38,15 +53,67 @@ def word_frequencies(text: str) -> dict[str, int]:
     return freq
 
 
-def count_words(text: str) -> int:
+def _normalized_frequencies(text: str,
+                            normalizer: Callable[[str], str]
+                            ) -> dict[str, int]:
+    # Count raw tokens first, then normalize each distinct one once.
+    freq: dict[str, int] = {}
+    for token, count in Counter(text.split()).items():
+        w = normalizer(token)
+        if w:
+            freq[w] = freq.get(w, 0) + count
+    return freq
+
+
+def normalize_word(token: str) -> str:
+    """Trim surrounding punctuation and lowercase a single token."""
+    return token.strip(punctuation).lower()
+
+
+def iter_words(text: str,
+               normalizer: Callable[[str], str] | None = None
+               ) -> Iterator[str]:
+    """Yield normalized words one at a time, in the order they appear."""
+    normalize = normalizer or normalize_word
+    for token in text.split():
+        w = normalize(token)
+        if w:
+            yield w
+
+
+def count_words(text: str,
+                normalizer: Callable[[str], str] | None = None) -> int:
     """Count words in the text after normalization."""
-    freq = word_frequencies(text)
+    freq = word_frequencies(text, normalizer)
     return sum(freq.values())
 
 
-def most_common_word(text: str) -> str:
+def most_common_word(text: str,
+                     normalizer: Callable[[str], str] | None = None) -> str:
     """Return the most common word in the text, or empty string if none."""
-    freq = word_frequencies(text)
+    freq = word_frequencies(text, normalizer)
     if not freq:
         return ""
     return max(freq, key=freq.get)
+
+
+def count_unique_words(text: str,
+                       normalizer: Callable[[str], str] | None = None
+                       ) -> tuple[int, bool]:
+    """Return ``(count, is_exact)`` for the number of distinct words.
+
+    Small vocabularies are counted exactly; large ones are estimated
+    with a HyperLogLog sketch, in which case ``is_exact`` is False.
+    """
+    counter = UniqueCounter()
+    counter.update(iter_words(text, normalizer))
+    return counter.count(), counter.is_exact
+
+
+def top_ngrams(text: str, n: int = 2, k: int = 10, min_count: int = 1,
+               normalizer: Callable[[str], str] | None = None
+               ) -> list[tuple[tuple[str, ...], int]]:
+    """Return the ``k`` most frequent ``n``-grams of normalized words."""
+    counter = NgramCounter(n, min_count=min_count)
+    counter.update(iter_words(text, normalizer))
+    return counter.most_common(k)
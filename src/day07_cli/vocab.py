@@ -0,0 +1,268 @@
+"""Word counting by dense integer IDs instead of a ``str -> int`` dict.
+
+A ``Vocabulary`` interns each distinct word once and hands out IDs
+0, 1, 2, ... in first-seen order. ``IdCounter`` turns every chunk of
+words into an ``array('I')`` of IDs and adds them into a flat count
+array, so the table costs a few bytes per word instead of a dict entry
+and a string object per count.
+
+Raw tokens can skip the word level entirely: ``TokenIds`` maps each
+distinct raw token to its word ID the first time it is seen (normalizing
+it once for the whole run), and ``IdCounter.add_tokens`` counts a chunk
+of tokens through that map. ``TextStats`` does this when given an
+``IdCounter``, so no per-chunk ``str -> int`` dict is built.
+
+With NumPy installed the counts live in an ``int64`` array, each chunk is
+counted with ``numpy.bincount`` and ``most_common(k)`` uses
+``argpartition`` instead of sorting the whole vocabulary. Without NumPy
+the same API falls back to ``array('Q')`` and ``collections.Counter``.
+
+Because IDs follow first appearance, ``to_dict()`` returns exactly what
+``word_frequencies()`` returns for the same words, in the same order, and
+ties in ``most_common`` go to the word seen first.
+"""
+
+from __future__ import annotations
+
+import heapq
+from array import array
+from collections import Counter
+from typing import Callable, Iterable, Iterator
+
+from text_utils import normalize_word
+
+try:
+    import numpy as np
+except ImportError:  # optional: pure-Python fallback below
+    np = None
+
+
+class _Interner(dict):
+    """``word -> id`` map that assigns the next ID to unseen words."""
+
+    def __init__(self, words: list[str]) -> None:
+        super().__init__()
+        self.words = words
+
+    def __missing__(self, word: str) -> int:
+        i = self[word] = len(self.words)
+        self.words.append(word)
+        return i
+
+
+class Vocabulary:
+    """Dense word IDs, assigned in first-seen order."""
+
+    def __init__(self) -> None:
+        self.words: list[str] = []
+        self._ids = _Interner(self.words)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def __contains__(self, word: str) -> bool:
+        return dict.__contains__(self._ids, word)
+
+    def id(self, word: str) -> int:
+        """Return the ID of ``word``, interning it if needed."""
+        return self._ids[word]
+
+    def get(self, word: str) -> int | None:
+        """Return the ID of ``word`` without interning it."""
+        return dict.get(self._ids, word)
+
+    def encode(self, words: Iterable[str]) -> array:
+        """Return the IDs of ``words`` as an ``array('I')``."""
+        # map() over the bound lookup stays in C except for new words.
+        return array("I", map(self._ids.__getitem__, words))
+
+
+class TokenIds(dict):
+    """``raw token -> word ID`` map that normalizes each new token once.
+
+    Tokens that normalize to the empty string (dropped) map to -1.
+    """
+
+    def __init__(self, vocab: Vocabulary,
+                 normalize: Callable[[str], str]) -> None:
+        super().__init__()
+        self.vocab = vocab
+        self.normalize = normalize
+
+    def __missing__(self, token) -> int:
+        word = self.normalize(token)
+        i = self[token] = self.vocab.id(word) if word else -1
+        return i
+
+
+class IdCounter:
+    """Word frequencies kept as a count array indexed by vocabulary ID.
+
+    Usable as a ``TextStats`` counter (``add``/``most_common``) or as a
+    word sink (``update``).
+    """
+
+    def __init__(self, vocab: Vocabulary | None = None) -> None:
+        self.vocab = vocab if vocab is not None else Vocabulary()
+        self.total = 0
+        if np is not None:
+            self._counts = np.zeros(1024, dtype=np.int64)
+        else:
+            self._counts = array("Q")
+
+    @property
+    def uses_numpy(self) -> bool:
+        return np is not None
+
+    def _reserve(self, n: int) -> None:
+        """Make room for counts of IDs below ``n``."""
+        size = len(self._counts)
+        if n <= size:
+            return
+        if np is not None:
+            grown = np.zeros(max(n, 2 * size), dtype=np.int64)
+            grown[:size] = self._counts
+            self._counts = grown
+        else:
+            self._counts.extend(array("Q", bytes(8 * (n - size))))
+
+    def update(self, words: Iterable[str]) -> None:
+        """Count ``words`` (one occurrence each)."""
+        self.add_ids(self.vocab.encode(words))
+
+    def add_ids(self, ids: array) -> None:
+        """Count a chunk of word IDs (an ``array('I')``)."""
+        if not ids:
+            return
+        n = len(self.vocab)
+        self.total += len(ids)
+        self._reserve(n)
+        if np is not None:
+            chunk = np.bincount(np.frombuffer(ids, dtype=np.uint32),
+                                minlength=n)
+            self._counts[:n] += chunk
+        else:
+            counts = self._counts
+            for i, c in Counter(ids).items():
+                counts[i] += c
+
+    def token_ids(self, normalize: Callable[[str], str]) -> TokenIds:
+        """Return a ``raw token -> ID`` map for ``add_tokens``."""
+        return TokenIds(self.vocab, normalize)
+
+    def add_tokens(self, tokens: list, token_ids: TokenIds) -> int:
+        """Count a chunk of raw tokens, mapped to IDs by ``token_ids``.
+
+        Returns the number of words counted (dropped tokens excluded).
+        """
+        if not tokens:
+            return 0
+        lookup = token_ids.__getitem__
+        if np is not None:
+            # One C-level pass maps the chunk to IDs; bincount does the
+            # rest. Dropped tokens (-1) land in bin 0.
+            ids = np.fromiter(map(lookup, tokens), dtype=np.int64,
+                              count=len(tokens))
+            n = len(self.vocab)
+            self._reserve(n)
+            chunk = np.bincount(ids + 1, minlength=n + 1)
+            self._counts[:n] += chunk[1:]
+            added = len(tokens) - int(chunk[0])
+        else:
+            # Count the raw tokens in C, then one ID per distinct token.
+            raw = Counter(tokens)
+            ids = list(map(lookup, raw))
+            self._reserve(len(self.vocab))
+            table = self._counts
+            added = 0
+            for i, c in zip(ids, raw.values()):
+                if i >= 0:
+                    table[i] += c
+                    added += c
+        self.total += added
+        return added
+
+    def add(self, counts: dict[str, int]) -> None:
+        """Add a chunk of ``word -> count`` (the ``WordCounter`` API)."""
+        if not counts:
+            return
+        ids = self.vocab.encode(counts)
+        n = len(self.vocab)
+        self.total += sum(counts.values())
+        self._reserve(n)
+        if np is not None:
+            # IDs within one dict are unique, so fancy-index += is safe.
+            values = np.fromiter(counts.values(), dtype=np.int64,
+                                 count=len(counts))
+            self._counts[np.frombuffer(ids, dtype=np.uint32)] += values
+        else:
+            table = self._counts
+            for i, c in zip(ids, counts.values()):
+                table[i] += c
+
+    def count(self, word: str) -> int:
+        i = self.vocab.get(word)
+        return int(self._counts[i]) if i is not None else 0
+
+    def counts(self):
+        """Counts indexed by ID (a NumPy array, or ``array('Q')``)."""
+        return self._counts[:len(self.vocab)]
+
+    def to_dict(self) -> dict[str, int]:
+        """Return ``word -> count`` in first-seen order."""
+        counts = self.counts()
+        if np is not None:
+            counts = counts.tolist()
+        return {w: c for w, c in zip(self.vocab.words, counts) if c}
+
+    def most_common(self, k: int | None = None) -> list[tuple[str, int]]:
+        """Return the ``k`` most frequent words (ties: first seen first)."""
+        counts = self.counts()
+        n = len(counts)
+        if k is None or k >= n:
+            return list(self.by_count())
+        if k <= 0:
+            return []
+        words = self.vocab.words
+        if np is None:
+            top = heapq.nsmallest(k, range(n),
+                                  key=lambda i: (-counts[i], i))
+            return [(words[i], counts[i]) for i in top if counts[i]]
+
+        # argpartition finds the k-th largest count in O(n); ties at that
+        # count are then filled in ID (first-seen) order.
+        threshold = counts[np.argpartition(counts, n - k)[n - k]]
+        above = np.flatnonzero(counts > threshold)
+        at = np.flatnonzero(counts == threshold)[:k - len(above)]
+        top = np.concatenate((above, at))
+        top = top[np.lexsort((top, -counts[top]))]
+        return [(words[i], int(counts[i])) for i in top.tolist()
+                if counts[i]]
+
+    def by_count(self) -> Iterator[tuple[str, int]]:
+        """Yield every ``(word, count)``, most frequent first."""
+        counts = self.counts()
+        words = self.vocab.words
+        if np is not None:
+            order = np.argsort(-counts, kind="stable").tolist()
+            counts = counts.tolist()
+        else:
+            order = sorted(range(len(counts)), key=lambda i: -counts[i])
+        for i in order:
+            if not counts[i]:
+                return
+            yield words[i], counts[i]
+
+
+def id_frequencies(text: str,
+                   normalizer: Callable[[str], str] | None = None
+                   ) -> IdCounter:
+    """Count the normalized words of ``text`` with an ``IdCounter``.
+
+    ``id_frequencies(text).to_dict() == word_frequencies(text)``.
+    """
+    counter = IdCounter()
+    # IDs are handed out in first-seen order, as word_frequencies() does.
+    counter.add_tokens(text.split(),
+                       counter.token_ids(normalizer or normalize_word))
+    return counter
@@ -0,0 +1,183 @@
+"""Follow growing files and keep their statistics up to date.
+
+``FileTail`` remembers how far into a file it has read, so after an
+append only the new bytes are fed to its ``TextStats``. If the file
+shrinks or is replaced (log rotation) the statistics start over.
+
+``ChangeWaiter`` blocks until something may have changed. On Linux it
+uses inotify (through ``ctypes``, no extra packages) on the parent
+directories of the watched files, so an idle watch costs no CPU at all;
+elsewhere it falls back to sleeping and re-checking ``os.stat()``.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import select
+import time
+from pathlib import Path
+from typing import Callable, Iterable
+
+from streaming import DEFAULT_CHUNK_SIZE, TextStats, iter_chunks
+
+
+DEFAULT_INTERVAL = 2.0
+DEFAULT_POLL_INTERVAL = 1.0
+
+# inotify flags (see <sys/inotify.h>).
+_IN_MODIFY = 0x002
+_IN_ATTRIB = 0x004
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = os.O_CLOEXEC
+_DIR_EVENTS = (_IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_TO
+               | _IN_CREATE | _IN_DELETE)
+
+
+class FileTail:
+    """Incrementally analyze a single file as it grows."""
+
+    def __init__(self, path: Path, make_stats: Callable[[], TextStats],
+                 chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+        self.path = path
+        self.make_stats = make_stats
+        self.chunk_size = chunk_size
+        self.stats = make_stats()
+        self.offset = 0
+        self._inode: int | None = None
+
+    def poll(self) -> bool:
+        """Read whatever was appended since the last call.
+
+        Returns True when the statistics changed.
+
+        Raises:
+            PermissionError, OSError: if the file exists but can't be read.
+            UnicodeDecodeError: if the new bytes are not valid UTF-8.
+        """
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            # Mid-rotation: keep the old numbers until the file reappears.
+            return False
+
+        if st.st_ino != self._inode or st.st_size < self.offset:
+            changed = self.offset > 0
+            self.stats = self.make_stats()
+            self.offset = 0
+            self._inode = st.st_ino
+        else:
+            changed = False
+
+        if st.st_size == self.offset:
+            return changed
+
+        with self.path.open("rb") as f:
+            f.seek(self.offset)
+            for chunk in iter_chunks(f, self.chunk_size):
+                self.stats.feed(chunk)
+                self.offset += len(chunk)
+        return True
+
+
+class ChangeWaiter:
+    """Wait for changes to a set of files: inotify if possible, else poll."""
+
+    def __init__(self, paths: Iterable[Path],
+                 poll_interval: float = DEFAULT_POLL_INTERVAL) -> None:
+        self.poll_interval = poll_interval
+        self._fd: int | None = None
+        self._init_inotify({Path(p).resolve().parent for p in paths})
+
+    @property
+    def uses_inotify(self) -> bool:
+        return self._fd is not None
+
+    def _init_inotify(self, directories: set[Path]) -> None:
+        name = ctypes.util.find_library("c")
+        if name is None:
+            return
+        try:
+            libc = ctypes.CDLL(name, use_errno=True)
+            init = libc.inotify_init1
+            add_watch = libc.inotify_add_watch
+        except (OSError, AttributeError):
+            return  # not Linux
+
+        fd = init(_IN_NONBLOCK | _IN_CLOEXEC)
+        if fd < 0:
+            return
+        for directory in directories:
+            if add_watch(fd, os.fsencode(directory), _DIR_EVENTS) < 0:
+                os.close(fd)
+                return
+        self._fd = fd
+
+    def wait(self, timeout: float | None) -> None:
+        """Block until a change is reported or ``timeout`` seconds pass.
+
+        ``timeout=None`` waits indefinitely with inotify; when polling it
+        is capped at ``poll_interval`` so new data is noticed promptly.
+        """
+        if self._fd is None:
+            if timeout is None or timeout > self.poll_interval:
+                timeout = self.poll_interval
+            time.sleep(timeout)
+            return
+
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if ready:
+            # Drain the queued events; callers re-check file sizes anyway.
+            try:
+                while os.read(self._fd, 64 * 1024):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+def watch(tails: list[FileTail], on_update: Callable[[FileTail], None],
+          interval: float = DEFAULT_INTERVAL,
+          poll_interval: float = DEFAULT_POLL_INTERVAL) -> None:
+    """Call ``on_update`` for each changed file, at most every ``interval``.
+
+    Runs until interrupted (e.g. Ctrl-C raises ``KeyboardInterrupt``).
+    Every tail is reported once at the start.
+    """
+    waiter = ChangeWaiter((t.path for t in tails), poll_interval)
+    try:
+        for tail in tails:
+            tail.poll()
+            on_update(tail)
+
+        dirty: set[int] = set()
+        next_emit = time.monotonic() + interval
+        while True:
+            # With nothing pending, sleep until the next change; otherwise
+            # only until the next report is due.
+            timeout = None
+            if dirty:
+                timeout = max(0.0, next_emit - time.monotonic())
+            waiter.wait(timeout)
+
+            for i, tail in enumerate(tails):
+                if tail.poll():
+                    dirty.add(i)
+
+            now = time.monotonic()
+            if dirty and now >= next_emit:
+                for i in sorted(dirty):
+                    on_update(tails[i])
+                dirty.clear()
+                next_emit = now + interval
+    finally:
+        waiter.close()